@@ -2,13 +2,33 @@ import logging
 import os
 import typing
 
+import orjson
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 
 from interpersonal import database
 from interpersonal.blueprints import indieauth, micropub, root
+from interpersonal.blueprints.indieauth.verify_cache import VerifiedBearerTokenCache
 from interpersonal.configuration.appconfig import AppConfig
 
 
+class OrjsonProvider(DefaultJSONProvider):
+    """A Flask JSON provider that uses orjson
+
+    Used by jsonify() and request.get_json().
+    orjson.dumps() returns bytes, but Flask expects a str.
+    """
+
+    def dumps(self, obj: typing.Any, **kwargs: typing.Any) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: typing.Union[str, bytes], **kwargs: typing.Any) -> typing.Any:
+        return orjson.loads(s)
+
+
 def add_security_headers(resp, csp_form_action_uris: typing.List[str] = None):
     """Add headers to routes
 
@@ -64,6 +84,7 @@ def create_app(
         raise
 
     app = Flask(__name__, instance_relative_config=True)
+    app.json = OrjsonProvider(app)
 
     app.logger.setLevel(logging.getLevelName(appconfig.loglevel))
 
@@ -75,6 +96,16 @@ def create_app(
         MEDIASTAGING=appconfig.mediastaging,
         # A valid AppConfig object
         APPCONFIG=appconfig,
+        # Recently verified bearer tokens; disabled if the TTL is 0
+        BEARER_TOKEN_CACHE=VerifiedBearerTokenCache(
+            appconfig.bearer_token_cache_seconds
+        ),
+        # Reject larger request bodies (e.g. media uploads) before they are parsed;
+        # None means no limit
+        MAX_CONTENT_LENGTH=appconfig.max_request_bytes,
+        # Let a fronting web server send staged media files via the X-Sendfile header,
+        # instead of streaming them through Python
+        USE_X_SENDFILE=appconfig.use_x_sendfile,
         # A secret, random value used to encrypt the session cookie
         SECRET_KEY=appconfig.cookie_secret_key,
         # Require HTTPS before setting the session cookie
@@ -90,6 +121,10 @@ def create_app(
     if test_config is not None:
         app.config.from_mapping(test_config)
 
+    # Also keep the AppConfig as a plain attribute,
+    # which is cheaper to reach from current_app than a config lookup on every request
+    app.appconfig = app.config["APPCONFIG"]
+
     database.init_app(app)
 
     app.register_blueprint(root.bp)
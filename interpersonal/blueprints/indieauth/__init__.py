@@ -1,13 +1,8 @@
-import base64
 import datetime
-import hashlib
-import re
 import secrets
-import sqlite3
 from urllib.parse import unquote
 
 import rfc3986
-from cryptography.hazmat.primitives import constant_time
 from flask import (
     Blueprint,
     current_app,
@@ -28,14 +23,14 @@ from interpersonal.consts import (
 )
 from interpersonal.blueprints.indieauth.util import (
     bearer_verify_token,
+    get_auth_header_token,
     indieauth_required,
+    redeem_auth_code,
 )
+from interpersonal.configuration.appconfig import get_blog
 from interpersonal.util import uri_copy_and_append_query
 
 from interpersonal.errors import (
-    IndieauthCodeVerifierMismatchError,
-    IndieauthInvalidGrantError,
-    InvalidAuthCodeError,
     InvalidBearerTokenError,
     render_error,
     catchall_error_handler,
@@ -45,6 +40,16 @@ from interpersonal.errors import (
 COOKIE_INDIE_AUTHED = "indie_authed"
 COOKIE_INDIE_AUTHED_VALUE = "indied (indeed) (lol)"
 
+# Endpoints that never check cookie authentication.
+# Skipping them in load_logged_in_user() avoids decrypting the session cookie.
+ENDPOINTS_NO_COOKIE_AUTH = frozenset(
+    {
+        "static",
+        "micropub.micropub_blog_media",
+        "micropub.micropub_blog_staging",
+    }
+)
+
 
 bp = Blueprint("indieauth", __name__, url_prefix="/indieauth", template_folder="temple")
 
@@ -58,7 +63,10 @@ def load_logged_in_user():
 
     It is safe to do this in the cookie, because we are using encrypted cookies.
     """
-    g.indieauthed = session.get(COOKIE_INDIE_AUTHED) is not None
+    if request.endpoint in ENDPOINTS_NO_COOKIE_AUTH:
+        g.indieauthed = False
+        return
+    g.indieauthed = COOKIE_INDIE_AUTHED in session
 
 
 @bp.route("/")
@@ -76,7 +84,7 @@ def login():
             error = "No password passed to form"
 
         else:
-            config_login_password = current_app.config["APPCONFIG"].password
+            config_login_password = current_app.appconfig.password
             if form_login_password != config_login_password:
                 error = f"Incorrect login token '{form_login_password}'"
             else:
@@ -115,7 +123,7 @@ def authorize_GET(blog_name: str):
     me - (optional) The URL that the user entered
     """
 
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
+    blog = get_blog(blog_name)
 
     client_id = request.args.get("client_id")
     redirect_uri = request.args.get("redirect_uri")
@@ -187,7 +195,7 @@ def authorize_POST(blog_name: str):
     client_id - The client URL
     redirect_uri - The redirect URL indicating where the user should be redirected to after approving the request
     """
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
+    blog = get_blog(blog_name)
 
     authorization_code = request.form["code"]
     origin_host = request.headers["Host"]
@@ -224,7 +232,7 @@ def grant(blog_name: str):
     if request.headers.get("sec-fetch-site", "same-origin") != "same-origin":
         return render_error(401, "Request must be same origin")
 
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
+    blog = get_blog(blog_name)
 
     client_id = unquote(request.form.get("client_id"))
     redirect_uri = unquote(request.form.get("redirect_uri"))
@@ -277,74 +285,6 @@ def grant(blog_name: str):
     return redirect(redir_dest, 302)
 
 
-def redeem_auth_code(
-    authorization_code: str,
-    client_id: str,
-    redirect_uri: str,
-    origin_host: str,
-    code_verifier: str = "",
-) -> sqlite3.Row:
-    """Use an auth code
-
-    Marks the code used and returns a new bearer token.
-
-    Parameters
-
-        code: An authorization code. This must be a code of type 'authorization_code', not like something else, TODO idk what else it could be tho.
-        client_id: ID of the client app (should be a URI)
-        redirect_uri: Redirect here after redeeming the code
-        origin_host: The origin host, retrieved from the Host header of the HTTP request
-        code_verifier: Required for the S256 code challenge method
-    """
-    db = database.get_db()
-    row = db.execute(
-        "SELECT used, host, clientId, redirectUri, codeChallenge, codeChallengeMethod, time FROM AuthorizationCode WHERE authorizationCode = ?",
-        (authorization_code,),
-    ).fetchone()
-    if not row:
-        raise InvalidAuthCodeError(authorization_code)
-
-    if (
-        datetime.datetime.utcnow() - row["time"] > datetime.timedelta(minutes=5)
-        or client_id != row["clientId"]
-        or redirect_uri != row["redirectUri"]
-        or row["used"]
-        or row["host"] != origin_host
-    ):
-        raise IndieauthInvalidGrantError
-
-    if row["codeChallengeMethod"] == "S256":
-        if not code_verifier:
-            return render_error(400, "Missing code_verifier for S256")
-
-        # You can add the == padding even if it is not necessary
-        # <https://stackoverflow.com/a/49459036>
-        # TODO: Test this code
-        # I don't understand the codeChallenge stuff, so I don't test it yet.
-        decoded_code_challenge = base64.urlsafe_b64decode(row["codeChallenge"] + "==")
-        if not constant_time.bytes_eq(
-            hashlib.sha256(code_verifier.encode()).digest(),
-            decoded_code_challenge,
-        ):
-            raise IndieauthCodeVerifierMismatchError
-
-    db.execute(
-        "UPDATE AuthorizationCode SET used = 1 WHERE authorizationCode = ?",
-        (authorization_code,),
-    )
-    db.commit()
-
-    # Get the same row back from the database again
-    # This means it'll pick up the change we made - setting it to used
-    # which is useful in testing
-    finalrow = db.execute(
-        "SELECT authorizationCode, time, clientId, redirectUri, codeChallenge, codeChallengeMethod, scopes, host, used FROM AuthorizationCode WHERE authorizationCode = ?",
-        (authorization_code,),
-    ).fetchone()
-
-    return finalrow
-
-
 @bp.route("/bearer/<blog_name>", methods=["GET"])
 @indieauth_required(["GET"])
 def bearer_GET(blog_name: str):
@@ -354,9 +294,8 @@ def bearer_GET(blog_name: str):
 
     <https://indieweb.org/token-endpoint#Verifying_an_Access_Token>
     """
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
-    authh = request.headers["Authorization"]
-    token = re.sub("^Bearer ", "", authh)
+    blog = get_blog(blog_name)
+    token = get_auth_header_token(request.headers["Authorization"])
     return jsonify(bearer_verify_token(token, blog.baseuri))
 
 
@@ -372,7 +311,7 @@ def bearer_POST(blog_name: str):
     <https://indieweb.org/token-endpoint#Granting_an_Access_Token>
     """
 
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
+    blog = get_blog(blog_name)
 
     current_app.logger.debug(f"bearer_POST(): request.form: {request.form}")
 
@@ -381,13 +320,22 @@ def bearer_POST(blog_name: str):
     action = request.form.get("action")
 
     if action == "revoke":
-        token = request.form["token"]
+        token = request.form.get("token")
+        if not token:
+            return render_error(400, "Missing required form field 'token'")
         tokRow = db.execute(
-            "SELECT host from BearerToken WHERE token = ?", (token,)
+            "SELECT host FROM BearerToken WHERE bearerToken = ?", (token,)
         ).fetchone()
-        if tokRow["host"] == request.headers["host"]:
-            db.execute("UPDATE BearerToken SET revoked 1 WHERE token = ?;", (token,))
-        return
+        if tokRow and tokRow["host"] == request.headers["host"]:
+            db.execute(
+                "UPDATE BearerToken SET revoked = TRUE WHERE bearerToken = ?;",
+                (token,),
+            )
+            db.commit()
+            # Make sure a cached verification can't outlive the token
+            current_app.config["BEARER_TOKEN_CACHE"].invalidate(token)
+        # Respond the same way whether or not the token was valid
+        return ""
 
     elif action and action != "create":
         return render_error(400, f"Invalid action {action}")
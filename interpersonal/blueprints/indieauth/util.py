@@ -15,6 +15,7 @@ from flask import (
 )
 
 from interpersonal import database
+from interpersonal.consts import ALL_HTTP_METHODS
 from interpersonal.errors import (
     IndieauthCodeVerifierMismatchError,
     IndieauthInvalidGrantError,
@@ -24,6 +25,20 @@ from interpersonal.errors import (
 )
 
 
+def get_auth_header_token(auth_header: str) -> str:
+    """Retrieve the bearer token from the authentication header
+
+    Only "Bearer " at the start of the header is removed,
+    so a token which happens to contain that string is left intact.
+    """
+    if not auth_header:
+        return ""
+    return auth_header.removeprefix("Bearer ").strip()
+
+
+ALL_HTTP_METHODS_SET = frozenset(ALL_HTTP_METHODS)
+
+
 def indieauth_required(methods):
     """A decorator to indicate that IndieAuth login is required for a given route
 
@@ -40,15 +55,26 @@ def indieauth_required(methods):
     <https://stackoverflow.com/questions/54032502/decorators-with-arguments-with-flask>
     """
 
+    protected_methods = frozenset(methods)
+    # When every method is protected, there is no need to check the request method
+    protects_all_methods = protected_methods >= ALL_HTTP_METHODS_SET
+
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             current_app.logger.debug(
-                f"@indieauth_required({methods}) wraps urlfunc {func.__name__}. request.method: {request.method}; g.indieauthed: {g.indieauthed}."
+                "@indieauth_required(%s) wraps urlfunc %s. request.method: %s; g.indieauthed: %s.",
+                methods,
+                func.__name__,
+                request.method,
+                g.indieauthed,
             )
-            if request.method in methods and not g.indieauthed:
+            if not g.indieauthed and (
+                protects_all_methods or request.method in protected_methods
+            ):
                 current_app.logger.debug(
-                    f"Attempted to visit {request.url} without logging in; redirecting to login page first..."
+                    "Attempted to visit %s without logging in; redirecting to login page first...",
+                    request.url,
                 )
                 return redirect(url_for("indieauth.login", next=request.url))
             return func(*args, **kwargs)
@@ -133,8 +159,21 @@ class VerifiedBearerToken(typing.TypedDict):
 
 
 def bearer_verify_token(token: str, me: str) -> VerifiedBearerToken:
-    """Verify a bearer token"""
+    """Verify a bearer token
+
+    If the bearer token cache is enabled, a recently verified token is not looked up again.
+    """
     # TODO: check the blog is correct in this function
+    # Tokens are generated by secrets.token_urlsafe(),
+    # so anything that isn't ASCII can be rejected without a database lookup.
+    if not token.isascii():
+        raise InvalidBearerTokenError(token)
+
+    cache = current_app.config["BEARER_TOKEN_CACHE"]
+    cached = cache.get(token, me)
+    if cached is not None:
+        return cached
+
     db = database.get_db()
     row = db.execute(
         """
@@ -145,7 +184,7 @@ def bearer_verify_token(token: str, me: str) -> VerifiedBearerToken:
             FROM
                 BearerToken
             WHERE
-                bearerToken = ?;
+                bearerToken = ? AND NOT revoked;
         """,
         (token,),
     ).fetchone()
@@ -153,8 +192,10 @@ def bearer_verify_token(token: str, me: str) -> VerifiedBearerToken:
         raise InvalidBearerTokenError(token)
     current_app.logger.debug(f"Found valid bearer token: {row}")
 
-    return {
+    verified: VerifiedBearerToken = {
         "me": me,
         "client_id": row["clientId"],
         "scopes": row["scopes"].split(" "),
-    }
\ No newline at end of file
+    }
+    cache.set(token, me, verified)
+    return verified
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""A cache for verified bearer tokens"""
+
+import hashlib
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+
+class VerifiedBearerTokenCache:
+    """A small in-memory LRU cache of verified bearer tokens
+
+    Verifying a bearer token requires a database lookup,
+    and micropub clients tend to reuse the same token for many requests in a row.
+    Keep recent verification results around for a short time.
+
+    Raw tokens are never stored;
+    entries are keyed on a hash of the token and the 'me' URI of the blog.
+
+    ttl:        Number of seconds to keep an entry.
+                If 0, the cache is disabled and every lookup is a miss.
+    maxsize:    Maximum number of entries.
+                When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl: float = 0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _hash(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str, me: str) -> typing.Any:
+        """Return the cached verification result, or None"""
+        if not self.ttl:
+            return None
+        key = (self._hash(token), me)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, token: str, me: str, value: typing.Any):
+        """Cache a verification result"""
+        if not self.ttl:
+            return
+        key = (self._hash(token), me)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """Remove all cached results for a token, regardless of blog"""
+        digest = self._hash(token)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == digest]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
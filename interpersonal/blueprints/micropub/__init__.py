@@ -4,16 +4,15 @@ Kept separate from indieauth, but note that it must know of the indieauth token
 endpoint in advance, so there is some coupling.
 """
 
-import json
+import functools
 import os.path
-import re
 import typing
-from urllib.parse import unquote
 
 from flask import (
     Blueprint,
     Request,
     current_app,
+    g,
     jsonify,
     render_template,
     request,
@@ -21,13 +20,14 @@ from flask import (
     url_for,
 )
 from flask.wrappers import Response
-from werkzeug.datastructures import Headers
 
 from interpersonal.blueprints.indieauth.util import (
     VerifiedBearerToken,
     bearer_verify_token,
+    get_auth_header_token,
     indieauth_required,
 )
+from interpersonal.configuration.appconfig import get_blog
 from interpersonal.consts import ALL_HTTP_METHODS
 
 from interpersonal.errors import (
@@ -39,7 +39,6 @@ from interpersonal.errors import (
     json_error,
 )
 from interpersonal.sitetypes.base import HugoBase
-from interpersonal.util import listflatten
 
 
 bp = Blueprint("micropub", __name__, url_prefix="/micropub", template_folder="temple")
@@ -48,6 +47,18 @@ bp = Blueprint("micropub", __name__, url_prefix="/micropub", template_folder="te
 bp.register_error_handler(Exception, catchall_error_handler)
 
 
+@bp.url_value_preprocessor
+def resolve_blog(endpoint: str, values: typing.Optional[typing.Dict]):
+    """Resolve the blog for routes that take a blog_name, once per request
+
+    The blog is stored on g, see get_blog().
+    Views can use g.blog directly.
+    An unknown blog_name raises MicropubBlogNotFoundError before the view is called.
+    """
+    if values and "blog_name" in values:
+        get_blog(values["blog_name"])
+
+
 @bp.route("/")
 @indieauth_required(ALL_HTTP_METHODS)
 def index():
@@ -55,16 +66,67 @@ def index():
 
     Show a list of configured blogs
     """
-    blogs = current_app.config["APPCONFIG"].blogs
+    blogs = current_app.appconfig.blogs
     return render_template("micropub.index.html.j2", blogs=blogs)
 
 
-def get_auth_header_token(auth_header: str) -> str:
-    """Retrieve the bearer token from the authentication header"""
-    if not auth_header:
-        return ""
-    token = re.sub("Bearer ", "", auth_header)
-    return token
+# Serialized q=config responses, keyed on (request.url_root, blog name).
+# The response only depends on the external URL of the app and the blog,
+# so there's no need to reverse the route and serialize it again for every request.
+# The cache belongs to each app, see _init_config_cache().
+MAX_CACHED_CONFIG_RESPONSES = 64
+
+
+@bp.record_once
+def _init_config_cache(state):
+    state.app.extensions["interpersonal_micropub_config"] = {}
+
+
+def _q_config(blog: HugoBase) -> Response:
+    """The micropub endpoint configuration"""
+    config_cache = current_app.extensions["interpersonal_micropub_config"]
+    key = (request.url_root, blog.name)
+    cached = config_cache.get(key)
+    if cached is None:
+        media_endpoint = url_for(
+            ".micropub_blog_media", blog_name=blog.name, _external=True
+        )
+        cached = current_app.json.dumps({"media-endpoint": media_endpoint})
+        # The Host header is client-controlled, so don't let the cache grow without bound
+        if len(config_cache) < MAX_CACHED_CONFIG_RESPONSES:
+            config_cache[key] = cached
+    return Response(cached, mimetype="application/json")
+
+
+def _q_source(blog: HugoBase) -> Response:
+    """Properties for a given "source", aka metadata for a given URL
+
+    e.g. tags, title, publish date, ... for a blog post
+
+    TODO: we ignore requests for specific properties and always return all properties, should we change this?
+    """
+    url = request.args.get("url")
+    if not url:
+        raise MicropubInvalidRequestError("Required 'url' parameter missing")
+    try:
+        post = blog.get_post(url)
+        return jsonify(post.mf2json)
+    # TODO: Raise a specific error in the blog object when a post is not found
+    except KeyError:
+        return json_error(404, "no such blog post")
+
+
+def _q_syndicate_to(blog: HugoBase) -> Response:
+    """Syndication targets"""
+    raise MicropubInvalidRequestError("syndication is not implemented")
+
+
+# Handlers for each supported value of the 'q' parameter in GET requests
+GET_Q_HANDLERS: typing.Dict[str, typing.Callable[[HugoBase], Response]] = {
+    "config": _q_config,
+    "source": _q_source,
+    "syndicate-to": _q_syndicate_to,
+}
 
 
 @bp.route("/<blog_name>", methods=["GET"])
@@ -76,7 +138,7 @@ def micropub_blog_endpoint_GET(blog_name: str):
       (syndication targets currently not supported)
     * Retrieve metadata for a given URL, such as published date and tags, in microformats2-json format
     """
-    blog = current_app.config["APPCONFIG"].blog(blog_name)
+    blog: HugoBase = g.blog
 
     auth_header = request.headers.get("Authorization")
     token = get_auth_header_token(auth_header)
@@ -86,55 +148,34 @@ def micropub_blog_endpoint_GET(blog_name: str):
 
     q = request.args.get("q")
 
-    current_app.logger.debug(f"Micropub endpoint with q={q}")
+    current_app.logger.debug("Micropub endpoint with q=%s", q)
 
-    # The micropub endpoint configuration
-    if q == "config":
-        media_endpoint = url_for(
-            ".micropub_blog_media", blog_name=blog.name, _external=True
-        )
-        return jsonify(
-            {
-                "media-endpoint": media_endpoint,
-            }
-        )
-
-    # Properties for a given "source", aka metadata for a given URL
-    # e.g. tags, title, publish date, ... for a blog post
-    # TODO: we ignore requests for specific properties and always return all properties, should we change this?
-    elif q == "source":
-        url = request.args.get("url")
-        if not url:
-            raise MicropubInvalidRequestError("Required 'url' parameter missing")
-        try:
-            post = blog.get_post(url)
-            return jsonify(post.mf2json)
-        # TODO: Raise a specific error in the blog object when a post is not found
-        except KeyError:
-            return json_error(404, "no such blog post")
-
-    elif q == "syndicate-to":
-        raise MicropubInvalidRequestError("syndication is not implemented")
-
-    else:
+    handler = GET_Q_HANDLERS.get(q)
+    if handler is None:
         raise MicropubInvalidRequestError(
             "Valid authorization, but invalid or missing 'q' parameter"
         )
+    return handler(blog)
 
 
 def authenticate_POST(
-    req_headers: Headers, processed_req_body: typing.Dict, blog: HugoBase
+    req: Request, blog: HugoBase, form_encoded: bool
 ) -> VerifiedBearerToken:
     """Authenticate a POST request
 
-    req_headers:            The Headaers from the request.
-    processed_req_body:     The processed body from the request.
-                            Normalized body whether this is a form or JSON request.
+    req:                    The request.
     blog:                   The blog for this request.
+    form_encoded:           True if the body is a form,
+                            either application/x-www-form-urlencoded or multipart/form-data.
 
     POST requetss can be authenticated by either an auth token header or an
     auth token in the submitted form.
 
+    The Authorization header is checked first.
+    If it is present, the token is verified before the body is parsed,
+    so unauthenticated requests are rejected without reading the body.
+    The body is only parsed to look for an access token if the request is form-encoded.
+
     TODO: Match OAuth Bearer Token RFC more closely
         Look for "access_token" in this document
         <https://datatracker.ietf.org/doc/html/rfc6750>
@@ -143,122 +184,177 @@ def authenticate_POST(
         "Micropub requests MUST be authenticated by including a Bearer Token in either the HTTP header or a form-encoded body parameter as described in the OAuth Bearer Token RFC."
         That RFC is constrained more than we are here, should fix.
     """
-    current_app.logger.debug(f"authenticate_POST: all headers: {req_headers}")
-    content_type = req_headers.get("Content-type")
-    form_encoded = (
-        content_type == "application/x-www-form-urlencoded"
-        or content_type.startswith("multipart/form-data")
-    )
-    body_access_token = processed_req_body.get("access_token")
-    auth_header_token = get_auth_header_token(req_headers.get("Authorization"))
-
-    # For future reference: see docs for AuthenticationProvidedTwiceError exception
-    # if auth_header and body_access_token:
-    #     raise AuthenticationProvidedTwiceError
-
-    if (
-        auth_header_token
-        and body_access_token
-        and auth_header_token != body_access_token
-    ):
-        raise AuthenticationProvidedTwiceError(auth_header_token, body_access_token)
-    elif form_encoded and body_access_token:
-        current_app.logger.debug(
-            f"authenticate_POST(): Using access_token from form..."
-        )
-        verified = bearer_verify_token(body_access_token, blog.baseuri)
-    else:
-        current_app.logger.debug(f"authenticate_POST(): Using Authorization header...")
-        auth_header_token = request.headers.get("Authorization")
-        token = get_auth_header_token(auth_header_token)
-        if not token:
-            raise MissingBearerTokenError()
-        verified = bearer_verify_token(token, blog.baseuri)
-    return verified
+    # Use lazy %-formatting so the headers are only stringified when debug logging is on
+    current_app.logger.debug("authenticate_POST: all headers: %s", req.headers)
+    auth_header_token = get_auth_header_token(req.headers.get("Authorization"))
+
+    if auth_header_token:
+        current_app.logger.debug("authenticate_POST(): Using Authorization header...")
+        verified = bearer_verify_token(auth_header_token, blog.baseuri)
+
+        # For future reference: see docs for AuthenticationProvidedTwiceError exception
+        # if auth_header and body_access_token:
+        #     raise AuthenticationProvidedTwiceError
+        if form_encoded:
+            body_access_token = req.form.get("access_token")
+            if body_access_token and body_access_token != auth_header_token:
+                raise AuthenticationProvidedTwiceError(
+                    auth_header_token, body_access_token
+                )
+        return verified
+
+    # Only form-encoded bodies may carry the access token,
+    # so don't look in the body at all otherwise.
+    body_access_token = req.form.get("access_token") if form_encoded else None
+    if not body_access_token:
+        raise MissingBearerTokenError()
+    current_app.logger.debug("authenticate_POST(): Using access_token from form...")
+    return bearer_verify_token(body_access_token, blog.baseuri)
+
+
+def parse_json_body(req: Request) -> typing.Tuple[typing.Dict, typing.Dict]:
+    """Parse an application/json POST body
+
+    Don't cache the raw body on the request; we only parse it once.
+    """
+    return (req.get_json(cache=False), {})
+
+
+def parse_urlencoded_body(req: Request) -> typing.Tuple[typing.Dict, typing.Dict]:
+    """Parse an application/x-www-form-urlencoded POST body"""
+    return (req.form, {})
+
+
+# The names of file attachments that Micropub expects in a multipart/form-data POST
+MICROPUB_MEDIA_TYPES = ("photo", "video", "audio")
+
+
+def parse_multipart_body(req: Request) -> typing.Tuple[typing.Dict, typing.Dict]:
+    """Parse a multipart/form-data POST body, including any attached files
 
+    Files uploaded in a multipart form MIGHT have a filename but WILL have a name.
+    The filename is optional and self-explanatory.
+    The name is the name of the form element that it was uploaded for,
+    and is the key for the MultiDict in req.files.
+    Micropub expects 'photo', 'video', and 'audio', but no other names.
+    There may be multiple files uploaded with the same name attribute,
+    if the <input> element in the HTML form allowed multiple selection.
+    See /docs/media.md for more details.
 
-def listflatten(lists) -> typing.List:
-    """Given a list of lists, return a flattened single list"""
-    return [val for sublist in lists for val in sublist]
+    Only media types that actually have attachments are returned,
+    so the caller does not process or add empty properties for the others.
+    """
+    request_files = {
+        mtype: req.files.getlist(mtype)
+        for mtype in MICROPUB_MEDIA_TYPES
+        if mtype in req.files
+    }
+    return (req.form, request_files)
+
+
+def content_type_mimetype(content_type: str) -> str:
+    """Given a Content-type header, return just the media type
+
+    Drop any parameters, like the boundary of a multipart/form-data body.
+    Media types are case-insensitive, so normalize to lower case.
+    """
+    return content_type.partition(";")[0].strip().lower()
+
+
+# Content types, without parameters, that may carry an access token in the body
+FORM_ENCODED_CONTENT_TYPES = frozenset(
+    {"application/x-www-form-urlencoded", "multipart/form-data"}
+)
+
+
+# Map a content type, without parameters like the multipart boundary,
+# to the function that parses a POST body of that type.
+POST_BODY_PARSERS = {
+    "application/json": parse_json_body,
+    "application/x-www-form-urlencoded": parse_urlencoded_body,
+    "multipart/form-data": parse_multipart_body,
+}
 
 
 def process_POST_body(
-    req: Request, content_type: str
+    req: Request, mimetype: str
 ) -> typing.Tuple[typing.Dict, typing.Dict]:
     """Process a POST request body and return a tuple of the body and files
 
-    Manage a POST body whether it is in JSON format or a form
+    Manage a POST body whether it is in JSON format or a form.
+    The body is parsed exactly once, by one of the POST_BODY_PARSERS.
+    Unsupported content types are rejected without reading the body.
 
-    WARNING: This function is called BEFORE the request is authenticated!
+    mimetype:   The Content-type of the request, without any parameters.
     """
-    request_body = {}
-    request_files = {}
-    if content_type == "application/json":
-        request_body = json.loads(req.data)
-    elif content_type == "application/x-www-form-urlencoded":
-        request_body = req.form
-    elif content_type.startswith("multipart/form-data"):
-        request_body = req.form
-        # Files uploaded in a multipart form MIGHT have a filename but WILL have a name.
-        # The filename is optional and self-explanatory.
-        # The name is the name of the form element that it was uploaded for,
-        # and is the key for the MultiDict in req.files.
-        # Micropub expects 'photo', 'video', and 'audio', but no other names.
-        # There may be multiple files uploaded with the same name attribute,
-        # if the <input> element in the HTML form allowed multiple selection.
-        # See /docs/media.md for more details.
-        request_files["photo"] = req.files.getlist("photo")
-        request_files["video"] = req.files.getlist("video")
-        request_files["audio"] = req.files.getlist("audio")
-    else:
-        raise MicropubInvalidRequestError(f"Invalid 'Content-type': '{content_type}'")
-    return (request_body, request_files)
+    parser = POST_BODY_PARSERS.get(mimetype)
+    if parser is None:
+        raise MicropubInvalidRequestError(f"Invalid 'Content-type': '{mimetype}'")
+    return parser(req)
 
 
-def form_body_to_mf2_json(request_body: typing.Dict):
-    """Given a request body from a form, return microformats2 json"""
+# Form elements reserved by Interpersonal or Micropub.
+# Micropub requires 'access_token', but I had 'auth_token' erroneously at first
+MF2_RESERVED_KEYS = frozenset({"auth_token", "access_token", "action", "h", "url"})
+
+# Ahh yes, the famous CUUD.
+# These are all actions supported by the spec:
+# {"delete", "undelete", "update", "create"}
+# But I don't support them all right now.
+# TODO: Support delete, undelete, and update actions
+SUPPORTED_ACTIONS = frozenset({"create"})
+
+
+# Form elements starting with these prefixes are also reserved
+MF2_RESERVED_PREFIXES = ("mp-",)
+
+
+@functools.lru_cache(maxsize=256)
+def form_key_to_mf2_property(key: str) -> typing.Optional[str]:
+    """Given the name of a form element, return the mf2 property name, or None
 
-    def is_reserved(key):
-        """Return True if form element is reserved by Interpersonal or Micropub
+    Returns None if the form element is reserved by Interpersonal or Micropub
+    <https://www.w3.org/TR/micropub/#h-reserved-properties>
 
-        <https://www.w3.org/TR/micropub/#h-reserved-properties>
+    "When creating posts using x-www-form-urlencoded or multipart/form-data requests, all other properties in the request are considered properties of the object being created."
 
-        "When creating posts using x-www-form-urlencoded or multipart/form-data requests, all other properties in the request are considered properties of the object being created."
-        """
-        # Micropub requires 'access_token', but I had 'auth_token' erroneously at first
-        reserved_keys = ["auth_token", "access_token", "action", "h", "url"]
-        reserved_prefixes = ["mp-"]
-        if key in reserved_keys:
-            return True
-        for prefix in reserved_prefixes:
-            if key.startswith(prefix):
-                return True
-        return False
+    If a key ends with [], strip it off.
+    This is the convention for list items in a form: ?tag[]=tag1&tag[]=tag2.
+
+    Clients send the same small set of keys over and over,
+    so the result is cached.
+    """
+    if key in MF2_RESERVED_KEYS or key.startswith(MF2_RESERVED_PREFIXES):
+        return None
+    if key.endswith("[]"):
+        return key[0:-2]
+    return key
+
+
+def form_body_to_mf2_json(request_body: typing.Dict):
+    """Given a request body from a form, return microformats2 json
 
+    Note that 'h' is reserved, so the type is always h-entry.
+    """
     result = {
         "type": ["h-entry"],
         "properties": {},
     }
-    for key in request_body:
+    properties = result["properties"]
+
+    # Walk the MultiDict once; .lists() yields each key along with all of its values.
+    for key, vals in request_body.lists():
+        propname = form_key_to_mf2_property(key)
+        if propname is None:
+            continue
 
-        # val is a list, possibly of just a single item, not a scalar.
+        # vals is a list, possibly of just a single item, not a scalar.
         # mf2 uses lists for many things, even that will just have a single value
         # like the post name, so this is actually fine.
-        # Form convention is that a list is made like this: ?tag[]=tag1&tag[]=tag2,
-        # and Request.form.getlist(key) turns those into a single tag with two elements.
-        val = [unquote(v) for v in request_body.getlist(key)]
-
-        if is_reserved(key):
-            continue
-        elif key == "h":
-            result["type"] = val
-        elif key.endswith("[]"):
-            # If a key ends with [], strip it off.
-            # As previously mentioned, this is the convention for list items in a form.
-            propname = key[0:-2]
-            result["properties"][propname] = val
-        else:
-            result["properties"][key] = val
+        # MultiDict.lists() turns ?tag[]=tag1&tag[]=tag2 into a single tag with two elements.
+        # Werkzeug has already percent-decoded the values, so don't decode them again.
+        # Merge with any values already sent under the bare name.
+        properties.setdefault(propname, []).extend(vals)
 
     return result
 
@@ -276,23 +372,31 @@ def micropub_blog_endpoint_POST(blog_name: str):
     This is in contrast to the media endpoint,
     which expects a single item with a `name` of simply `file`.
     """
-    blog: HugoBase = current_app.config["APPCONFIG"].blog(blog_name)
+    blog: HugoBase = g.blog
 
-    content_type = request.headers.get("Content-type")
+    # Resolve the request proxy once for all the header lookups below
+    headers = request.headers
+
+    content_type = headers.get("Content-type")
     if not content_type:
         raise MicropubInvalidRequestError("No 'Content-type' header")
-    request_body, request_files = process_POST_body(request, content_type)
-
-    current_app.logger.debug(
-        f"/{blog_name}: all headers before calling authentiate_POST: {request.headers}"
-    )
-    verified = authenticate_POST(request.headers, request_body, blog)
-
-    auth_test = request.headers.get("X-Interpersonal-Auth-Test")
-    # Check for the header we use in testing, and return a success message
+    mimetype = content_type_mimetype(content_type)
+    # Reject unsupported content types before authenticating or reading the body
+    if mimetype not in POST_BODY_PARSERS:
+        raise MicropubInvalidRequestError(f"Invalid 'Content-type': '{mimetype}'")
+    form_encoded = mimetype in FORM_ENCODED_CONTENT_TYPES
+
+    # authenticate_POST() logs all of the headers at debug level
+    verified = authenticate_POST(request, blog, form_encoded)
+
+    auth_test = headers.get("X-Interpersonal-Auth-Test")
+    # Check for the header we use in testing, and return a success message.
+    # This doesn't need the body, so return before parsing it.
     if auth_test:
         return jsonify({"interpersonal_test_result": "authentication_success"})
 
+    request_body, request_files = process_POST_body(request, mimetype)
+
     contype_test = request_body.get("interpersonal_content-type_test")
     # Check for the value we use in testing, and return a success message
     if contype_test:
@@ -300,24 +404,17 @@ def micropub_blog_endpoint_POST(blog_name: str):
             {
                 "interpersonal_test_result": contype_test,
                 "content_type": content_type,
-                "uploaded_file_count": len(listflatten(request_files.values())),
+                "uploaded_file_count": sum(map(len, request_files.values())),
             }
         )
 
     # Per spec, missing 'action' should imply create
     action = request_body.get("action", "create")
 
-    # Ahh yes, the famous CUUD.
-    # These are all actions supported by the spec:
-    # supported_actions = ["delete", "undelete", "update", "create"]
-    # But I don't support them all right now.
-    # TODO: Support delete, undelete, and update actions
-    supported_actions = ["create"]
-
     if action not in verified["scopes"]:
         raise MicropubInsufficientScopeError(action)
 
-    if action not in supported_actions:
+    if action not in SUPPORTED_ACTIONS:
         raise MicropubInvalidRequestError(f"'{action}' action not supported")
     actest = request_body.get("interpersonal_action_test")
     if actest:
@@ -325,32 +422,26 @@ def micropub_blog_endpoint_POST(blog_name: str):
 
     if action == "create":
 
-        if content_type == "application/json":
-            mf2obj = request_body
-        elif content_type == "application/x-www-form-urlencoded":
-            mf2obj = form_body_to_mf2_json(request_body)
-        elif content_type.startswith("multipart/form-data"):
-
+        if form_encoded:
             mf2obj = form_body_to_mf2_json(request_body)
-
-            # Multipart forms contain attachments.
-            # Upload the attachments, then append the URIs to the mf2 object.
-            # We want to append, not replace, the attachments -
-            # if the post includes a photo URI and also some photo uploads,
-            # we need to keep both.
-            # (Not sure if that actually happens out in the wild, but maybe?)
-            # mtype will be one of 'photo', 'video', 'audio'.
-            for mtype in request_files:
-                mitems = request_files[mtype]
-                added = blog.add_media(mitems)
-                if mtype not in mf2obj["properties"]:
-                    mf2obj["properties"][mtype] = []
-                mf2obj["properties"][mtype] += [a.uri for a in added]
-
         else:
-            raise MicropubInvalidRequestError(
-                f"Unhandled 'Content-type': '{content_type}'"
-            )
+            mf2obj = request_body
+
+        # Multipart forms contain attachments.
+        # Upload the attachments, then append the URIs to the mf2 object.
+        # We want to append, not replace, the attachments -
+        # if the post includes a photo URI and also some photo uploads,
+        # we need to keep both.
+        # (Not sure if that actually happens out in the wild, but maybe?)
+        # mtype will be one of 'photo', 'video', 'audio'.
+        # Other content types have no attachments, and request_files is empty;
+        # multipart forms only include media types that have attachments.
+        for mtype in request_files:
+            mitems = request_files[mtype]
+            added = blog.add_media(mitems)
+            if mtype not in mf2obj["properties"]:
+                mf2obj["properties"][mtype] = []
+            mf2obj["properties"][mtype] += [a.uri for a in added]
 
         new_post_location = blog.add_post_mf2(mf2obj)
         resp = Response("")
@@ -371,17 +462,17 @@ def micropub_blog_media(blog_name):
     Contrast with a multipart/form-data requiest of the main POST endpoint,
     which accepts attachments with a name of `photo`, `video`, or `audio`.
     """
-    blog: HugoBase = current_app.config["APPCONFIG"].blog(blog_name)
+    blog: HugoBase = g.blog
 
     content_type = request.headers.get("Content-type")
     if not content_type:
         raise MicropubInvalidRequestError("No 'Content-type' header")
-    if not content_type.startswith("multipart/form-data"):
+    if content_type_mimetype(content_type) != "multipart/form-data":
         raise MicropubInvalidRequestError(
             f"Invalid Content-type: {content_type}; only 'multipart/form-data' is supported for this endpoint."
         )
 
-    verified = authenticate_POST(request.headers, request.form, blog)
+    verified = authenticate_POST(request, blog, True)
     if "media" not in verified["scopes"]:
         raise MicropubInsufficientScopeError("media")
 
@@ -402,8 +493,13 @@ def micropub_blog_staging(blog_name, path):
     """The per-blog temporary media staging endpoint
 
     Blogs can be configured to save media here temporarily until a post is created.
+
+    If USE_X_SENDFILE is set, the fronting web server sends the file,
+    and it needs an absolute path.
     """
-    blog_media_staging = os.path.join(current_app.config["MEDIASTAGING"], blog_name)
+    blog_media_staging = os.path.abspath(
+        os.path.join(current_app.config["MEDIASTAGING"], blog_name)
+    )
     return send_from_directory(blog_media_staging, path)
 
 
@@ -424,7 +520,7 @@ def micropub_authorized():
     installation_id = request.form.get("installation_id")
     setup_action = request.form.get("setup_action")
 
-    blogs = current_app.config["APPCONFIG"].blogs
+    blogs = current_app.appconfig.blogs
 
     return render_template(
         "micropub.authorized.html.j2",
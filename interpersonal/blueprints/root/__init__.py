@@ -4,11 +4,12 @@ from flask import (
     render_template,
 )
 
-from interpersonal.errors import catchall_error_handler
+from interpersonal.errors import catchall_error_handler, init_rendered_error_pages
 
 
 bp = Blueprint("root", __name__, template_folder="temple")
 bp.register_error_handler(Exception, catchall_error_handler)
+bp.record_once(init_rendered_error_pages)
 
 
 @bp.route("/")
@@ -5,6 +5,7 @@ import os.path
 import typing
 
 import yaml
+from flask import current_app, g
 
 from interpersonal.configuration.basetypes import SiteSectionMap
 from interpersonal.errors import (
@@ -14,8 +15,14 @@ from interpersonal.errors import (
 from interpersonal.sitetypes import example, github
 from interpersonal.sitetypes.base import HugoBase
 
+# Prefer the LibYAML-based loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class AppConfig:
     """Application configuration"""
 
@@ -26,6 +33,16 @@ class AppConfig:
     cookie_secret_key: str
     csp_remote_trusted_sources: typing.List[str]
     blogs: typing.List[HugoBase]
+    bearer_token_cache_seconds: int = 0
+    max_request_bytes: typing.Optional[int] = None
+    use_x_sendfile: bool = False
+    _blogs_by_name: typing.Dict[str, HugoBase] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        # Index the blogs by name, so blog() doesn't scan the list on every request
+        self._blogs_by_name = {blog.name: blog for blog in self.blogs}
 
     @classmethod
     def fromyaml(cls, path: str) -> "AppConfig":
@@ -34,7 +51,7 @@ class AppConfig:
         Note that debug logging may not yet be available
         """
         with open(path) as fp:
-            yamlcontents = yaml.load(fp, yaml.Loader)
+            yamlcontents = yaml.load(fp, YamlSafeLoader)
 
         key_exc = None
         try:
@@ -48,6 +65,13 @@ class AppConfig:
             csp_remote_trusted_sources = yamlcontents.get(
                 "csp_remote_trusted_sources", []
             )
+            bearer_token_cache_seconds = int(
+                yamlcontents.get("bearer_token_cache_seconds", 0)
+            )
+            max_request_bytes = yamlcontents.get("max_request_bytes")
+            if max_request_bytes is not None:
+                max_request_bytes = int(max_request_bytes)
+            use_x_sendfile = bool(yamlcontents.get("use_x_sendfile", False))
         except KeyError as exc:
             key_exc = exc
         if key_exc:
@@ -134,11 +158,28 @@ class AppConfig:
             cookie_secret_key,
             csp_remote_trusted_sources,
             blogs,
+            bearer_token_cache_seconds,
+            max_request_bytes,
+            use_x_sendfile,
         )
 
     def blog(self, name: str) -> HugoBase:
         """Get a blog by name"""
-        for blog in self.blogs:
-            if blog.name == name:
-                return blog
-        raise MicropubBlogNotFoundError(name)
+        try:
+            return self._blogs_by_name[name]
+        except KeyError:
+            raise MicropubBlogNotFoundError(name)
+
+
+def get_blog(name: str) -> HugoBase:
+    """Get a blog by name for the current request
+
+    Like get_db(), the result is stored on g,
+    so handlers and helpers that need the blog during the same request
+    don't look it up again.
+    """
+    blog = g.get("blog")
+    if blog is None or blog.name != name:
+        blog = current_app.appconfig.blog(name)
+        g.blog = blog
+    return blog
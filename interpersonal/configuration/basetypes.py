@@ -35,7 +35,9 @@ class SiteSectionMap:
             )
         self.default = default
         self.mapping = mapping
+        # Look up the bound dict.get once instead of on every call to get()
+        self._mapping_get = mapping.get
 
     def get(self, key: str) -> str:
         """Get a value from the mapping, falling back to the default"""
-        return self.mapping.get(key, self.default)
+        return self._mapping_get(key, self.default)
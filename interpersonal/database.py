@@ -1,4 +1,6 @@
+import datetime
 import sqlite3
+import threading
 
 import click
 from flask import current_app, g
@@ -6,8 +8,16 @@ from flask.cli import with_appcontext
 
 
 # TODO: authTokenUsed could be a foreign key?
-CREATE_DB_SCHEMA = """
-
+# Both tables are only ever looked up by their TEXT primary key.
+# WITHOUT ROWID stores rows in the primary key B-tree itself,
+# so a lookup is a single B-tree search rather than the key index plus the rowid table.
+# Tables in existing databases that were created with a rowid are rebuilt by init_db().
+# STRICT tables are not used, because they don't allow the TIMESTAMP type,
+# which PARSE_DECLTYPES relies on to return datetime objects.
+# The statements are kept separate so that migrate_rowid_tables() can run them
+# in a single transaction, which executescript() would commit.
+CREATE_TABLES_SQL = {
+    "AuthorizationCode": """
 CREATE TABLE IF NOT EXISTS AuthorizationCode(
   authorizationCode TEXT PRIMARY KEY,
   time TIMESTAMP NOT NULL,
@@ -19,8 +29,9 @@ CREATE TABLE IF NOT EXISTS AuthorizationCode(
   scopes TEXT NOT NULL,
   host TEXT NOT NULL,
   used boolean DEFAULT FALSE
-);
-
+) WITHOUT ROWID;
+""",
+    "BearerToken": """
 CREATE TABLE IF NOT EXISTS BearerToken(
   bearerToken TEXT PRIMARY KEY,
   time TIMESTAMP NOT NULL,
@@ -29,9 +40,40 @@ CREATE TABLE IF NOT EXISTS BearerToken(
   scopes TEXT NOT NULL,
   host TEXT NOT NULL,
   revoked boolean DEFAULT FALSE
-);
+) WITHOUT ROWID;
+""",
+}
 
-"""
+# auto_vacuum only takes effect when set before the database file is initialized,
+# which switching to WAL mode does even before any table is created,
+# so databases created before it was added still need a full VACUUM to use it.
+# It can't be changed inside a transaction.
+AUTO_VACUUM_SQL = "PRAGMA auto_vacuum = INCREMENTAL;"
+
+
+def connect_db(dbpath: str) -> sqlite3.Connection:
+    """Open a new database connection and configure it
+
+    Incremental auto_vacuum is requested first, so that it applies to new databases.
+    WAL mode lets readers proceed while a write is in progress,
+    and synchronous=NORMAL is safe in WAL mode while avoiding an fsync on every commit.
+    Temporary tables and indices are kept in memory,
+    and the page cache is raised to about 20MB.
+    The prepared statement cache is larger than the default of 100,
+    so that the token and auth code queries aren't evicted by other statements.
+
+    Connections are long-lived (see get_db()), so this runs once per thread, not per request.
+    """
+    db = sqlite3.connect(
+        dbpath, detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=256
+    )
+    db.row_factory = sqlite3.Row
+    db.execute(AUTO_VACUUM_SQL)
+    db.execute("PRAGMA journal_mode=WAL;")
+    db.execute("PRAGMA synchronous=NORMAL;")
+    db.execute("PRAGMA temp_store=MEMORY;")
+    db.execute("PRAGMA cache_size=-20000;")
+    return db
 
 
 def get_db():
@@ -40,28 +82,119 @@ def get_db():
     Originally taken from the Flask tutorial
     <https://flask.palletsprojects.com/en/2.0.x/tutorial/database/>
     > g is a special object that is unique for each request. It is used to store data that might be accessed by multiple functions during the request. The connection is stored and reused instead of creating a new connection if get_db is called a second time in the same request.
+
+    Unlike the tutorial, the connection is also kept open between requests.
+    Each thread gets its own long-lived connection,
+    so requests don't pay for connecting and start with a warm statement cache.
     """
 
     if "db" not in g:
-        g.db = sqlite3.connect(
-            current_app.config["DBPATH"], detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        connections = current_app.extensions["interpersonal_db"]
+        db = getattr(connections, "db", None)
+        if db is None:
+            db = connections.db = connect_db(current_app.config["DBPATH"])
+        g.db = db
 
     return g.db
 
 
 def close_db(e=None):
+    """Release the database connection at the end of the request
+
+    The connection stays open for the next request on this thread,
+    but anything the request did not commit is discarded,
+    just like it would be if the connection were closed.
+    """
     db = g.pop("db", None)
 
-    if db is not None:
-        db.close()
+    if db is not None and db.in_transaction:
+        db.rollback()
+
+
+# The version of CREATE_TABLES_SQL, stored in the database by init_db()
+SCHEMA_VERSION = 1
+
+# Tables in the schema, which migrate_rowid_tables() will rebuild if necessary
+SCHEMA_TABLES = tuple(CREATE_TABLES_SQL)
+
+
+def _table_sql(db: sqlite3.Connection, table: str):
+    """Get the CREATE TABLE statement for a table, or None if it doesn't exist"""
+    row = db.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?;",
+        (table,),
+    ).fetchone()
+    return None if row is None else row["sql"]
+
+
+def migrate_rowid_tables(db: sqlite3.Connection):
+    """Create the schema, rebuilding tables created by older versions as WITHOUT ROWID tables
+
+    Older tables are renamed out of the way to {table}_rowid, recreated from CREATE_TABLES_SQL,
+    and their rows copied into the new tables.
+    The columns have not changed, only the table storage.
+
+    Everything happens in one transaction, so an interrupted migration leaves the old tables alone.
+    A {table}_rowid table left behind by an older, non-atomic migration is finished off
+    by copying any rows the new table is missing and dropping it.
+    """
+    db.execute("BEGIN;")
+    try:
+        for table, create_sql in CREATE_TABLES_SQL.items():
+            oldtable = f"{table}_rowid"
+            if _table_sql(db, oldtable) is None:
+                sql = _table_sql(db, table)
+                if sql is None or "WITHOUT ROWID" in sql.upper():
+                    db.execute(create_sql)
+                    continue
+                db.execute(f"ALTER TABLE {table} RENAME TO {oldtable};")
+            db.execute(create_sql)
+            db.execute(f"INSERT OR IGNORE INTO {table} SELECT * FROM {oldtable};")
+            db.execute(f"DROP TABLE {oldtable};")
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
 
 
 def init_db():
+    """Create or migrate the database schema
+
+    The schema version is recorded in PRAGMA user_version,
+    so initializing a database that is already current does nothing.
+    Increment SCHEMA_VERSION when changing CREATE_TABLES_SQL.
+    """
     db = get_db()
-    db.executescript(CREATE_DB_SCHEMA)
+    version = db.execute("PRAGMA user_version;").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    migrate_rowid_tables(db)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+    db.execute("ANALYZE;")
+    db.commit()
+
+
+def sweep_expired(db: sqlite3.Connection, max_age_seconds: int = 600):
+    """Delete authorization codes and bearer tokens that can no longer be used
+
+    Authorization codes are single use and expire after a few minutes,
+    so used codes and codes older than max_age_seconds are deleted.
+    Revoked bearer tokens are deleted too.
+    If the database uses incremental auto_vacuum,
+    the freed pages are returned to the filesystem.
+
+    Returns a tuple of the number of authorization codes and bearer tokens deleted.
+    """
+    oldest = datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age_seconds)
+    codes = db.execute(
+        "DELETE FROM AuthorizationCode WHERE used OR time < ?;", (oldest,)
+    ).rowcount
+    tokens = db.execute("DELETE FROM BearerToken WHERE revoked;").rowcount
     db.commit()
+    # execute() only steps the statement once, which frees a single page;
+    # executescript() runs it to completion.
+    db.executescript("PRAGMA incremental_vacuum;")
+    return codes, tokens
 
 
 @click.command("init-db")
@@ -72,9 +205,20 @@ def init_db_command():
     click.echo("Initialized the database.")
 
 
+@click.command("sweep-db")
+@with_appcontext
+def sweep_db_command():
+    """Delete used and expired authorization codes and revoked bearer tokens"""
+    codes, tokens = sweep_expired(get_db())
+    click.echo(f"Deleted {codes} authorization code(s) and {tokens} bearer token(s).")
+
+
 def init_app(app):
+    # Per-thread database connections, see get_db()
+    app.extensions["interpersonal_db"] = threading.local()
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(sweep_db_command)
 
 
 INSERT_AUTHORIZATION_CODE_SQL = """
@@ -1,13 +1,18 @@
+import functools
+import logging
 import traceback
+import typing
 
-from flask import current_app, jsonify, render_template
+import orjson
+from flask import current_app, g, jsonify, render_template, request, session
+from markupsafe import escape
 from werkzeug.exceptions import HTTPException
 
 
 def json_error(errcode: int, errmsg: str, errdesc: str = ""):
     """Return JSON error"""
     current_app.logger.error(
-        f"Error {errcode}: {errmsg}. Description: {errdesc or 'none'}"
+        "Error %s: %s. Description: %s", errcode, errmsg, errdesc or "none"
     )
     return (
         jsonify({"error": errmsg, "error_description": errdesc or ""}),
@@ -15,42 +20,170 @@ def json_error(errcode: int, errmsg: str, errdesc: str = ""):
     )
 
 
-def render_error(errcode: int, errmsg: str):
-    """Render an HTTP error page and log it"""
-    current_app.logger.error(errmsg)
+@functools.lru_cache(maxsize=32)
+def _static_json_error_body(errmsg: str, errdesc: str) -> bytes:
+    return orjson.dumps({"error": errmsg, "error_description": errdesc})
+
+
+def static_json_error(errcode: int, errmsg: str, errdesc: str = ""):
+    """Return JSON error with a fixed message
+
+    Like json_error(), but the serialized body is cached,
+    so only use this with messages that don't include request data.
+    """
+    app = current_app._get_current_object()
+    app.logger.error(
+        "Error %s: %s. Description: %s", errcode, errmsg, errdesc or "none"
+    )
+    return (
+        app.response_class(
+            _static_json_error_body(errmsg, errdesc or ""),
+            mimetype="application/json",
+        ),
+        errcode,
+    )
+
+
+# A placeholder for the variable part of templated JSON error bodies.
+# It contains no characters that JSON would escape.
+JSON_ERROR_VALUE_PLACEHOLDER = "__INTERPERSONAL_JSON_ERROR_VALUE_PLACEHOLDER__"
+_JSON_ERROR_VALUE_PLACEHOLDER_BYTES = JSON_ERROR_VALUE_PLACEHOLDER.encode()
+
+
+@functools.lru_cache(maxsize=32)
+def _templated_json_error_body(errmsg: str, errdesc_template: str) -> bytes:
+    return orjson.dumps(
+        {
+            "error": errmsg,
+            "error_description": errdesc_template % JSON_ERROR_VALUE_PLACEHOLDER,
+        }
+    )
+
+
+def templated_json_error(errcode: int, errmsg: str, errdesc_template: str, value):
+    """Return JSON error with a description made from a template and one value
+
+    errdesc_template is a %-style format string with a single %s.
+    Like static_json_error(), the serialized body is cached,
+    and the value is JSON encoded and substituted into it.
+    """
+    app = current_app._get_current_object()
+    app.logger.error(
+        "Error %s: %s. Description: " + errdesc_template, errcode, errmsg, value
+    )
+    # Encode the value as a JSON string and strip the surrounding quotes
+    encoded = orjson.dumps(str(value))[1:-1]
     return (
-        render_template("error.html.j2", error_code=errcode, error_desc=errmsg),
+        app.response_class(
+            _templated_json_error_body(errmsg, errdesc_template).replace(
+                _JSON_ERROR_VALUE_PLACEHOLDER_BYTES, encoded
+            ),
+            mimetype="application/json",
+        ),
         errcode,
     )
 
 
+# A placeholder for the error description in cached error pages.
+# It contains no characters that Jinja would escape.
+ERROR_DESC_PLACEHOLDER = "__INTERPERSONAL_ERROR_DESC_PLACEHOLDER__"
+
+# Rendered error pages with a placeholder for the description,
+# keyed on everything else the page depends on:
+# the error code, whether the user is logged in, and the URL root used for links.
+# The cache belongs to each app, see init_rendered_error_pages().
+MAX_RENDERED_ERROR_PAGES = 64
+
+
+def init_rendered_error_pages(state):
+    """Create the rendered error page cache for an app
+
+    Recorded once by the root blueprint when it is registered.
+    """
+    state.app.extensions["interpersonal_error_pages"] = {}
+
+
+def render_error(errcode: int, errmsg: typing.Optional[str]):
+    """Render an HTTP error page and log it
+
+    Error pages differ only by their code, description, and login status,
+    so the template is rendered once for each combination other than the description,
+    and the description is substituted in.
+    Pages with pending flashed messages are always rendered,
+    as are all pages when templates are reloaded automatically during development.
+    """
+    # Resolve the current_app proxy once, rather than for each attribute
+    app = current_app._get_current_object()
+    app.logger.error(errmsg)
+    # Some callers pass on a description that may be None
+    errmsg = errmsg or ""
+    if app.jinja_env.auto_reload or "_flashes" in session:
+        return (
+            render_template("error.html.j2", error_code=errcode, error_desc=errmsg),
+            errcode,
+        )
+    rendered_error_pages = app.extensions["interpersonal_error_pages"]
+    key = (errcode, bool(g.get("indieauthed")), request.url_root)
+    page = rendered_error_pages.get(key)
+    if page is None:
+        page = render_template(
+            "error.html.j2", error_code=errcode, error_desc=ERROR_DESC_PLACEHOLDER
+        )
+        # The Host header is client-controlled, so don't let the cache grow without bound
+        if len(rendered_error_pages) < MAX_RENDERED_ERROR_PAGES:
+            rendered_error_pages[key] = page
+    # Escape the description exactly as Jinja would have when rendering the template
+    if app.select_jinja_autoescape("error.html.j2"):
+        errmsg = str(escape(errmsg))
+    return (page.replace(ERROR_DESC_PLACEHOLDER, errmsg), errcode)
+
+
 def catchall_error_handler(exc: Exception):
     """Generic error handler
 
     Tries to use a built-in exception handler if it exists.
-    If not, writes the exception and traceback to the log and returns an
+    If not, writes the exception and traceback to the debug log and returns an
     internal server error.
+    The response includes the full traceback only in debug mode.
     """
 
     if isinstance(exc, HTTPException):
         # If this is a Flask/Werkzeug exception, just use it directly
-        raise exc
-
-    try:
-        # If it's a custom Interpersonal exception with a handler, use that handler
-        return exc.__interpersonal_exception_handler__()
-
-    except BaseException:
-        # Otherwise, it's unhandled and presumably unexpected.
-        # Fall back to a generic handler that includes as much information as possible
-        estr = "\n".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
-        current_app.logger.debug(
-            f"catchall_error_handler(): exception '{exc}' (type {type(exc)}) does not have an __interpersonal_exception_handler__() method, returning a 500 error. Full exception detauls:\n{estr}"
+        return exc
+
+    # If it's a custom Interpersonal exception with a handler, use that handler.
+    # Look it up on the class, which is a cached attribute lookup,
+    # instead of calling it and catching the AttributeError for other exceptions.
+    # Calling it with the exception works for both methods and staticmethods.
+    handler = getattr(type(exc), "__interpersonal_exception_handler__", None)
+    if handler is not None:
+        return handler(exc)
+
+    # Otherwise, it's unhandled and presumably unexpected.
+    # Fall back to a generic handler.
+    # Formatting the traceback reads source lines for every frame,
+    # so only do it if it will be logged or the app is in debug mode.
+    app = current_app._get_current_object()
+    estr = ""
+    if app.debug or app.logger.isEnabledFor(logging.DEBUG):
+        estr = "\n".join(
+            traceback.format_exception(type(exc), exc, exc.__traceback__)
+        )
+        app.logger.debug(
+            "catchall_error_handler(): exception '%s' (type %s) does not have an __interpersonal_exception_handler__() method, returning a 500 error. Full exception detauls:\n%s",
+            exc,
+            type(exc),
+            estr,
         )
-        return json_error(500, "Unhandled internal error", estr)
+    # Only send the full traceback to the client in debug mode
+    if not app.debug:
+        estr = f"{type(exc).__name__}: {exc}"
+    return json_error(500, "Unhandled internal error", estr)
 
 
 class InvalidAuthCodeError(Exception):
+    __slots__ = ("code",)
+
     def __init__(self, code):
         self.code = code
 
@@ -59,27 +192,37 @@ class InvalidAuthCodeError(Exception):
 
 
 class IndieauthInvalidGrantError(Exception):
+    __slots__ = ()
+
     def __interpersonal_exception_handler__(exc):
         return render_error(400, f"Invalid grant")
 
 
 class IndieauthCodeVerifierMismatchError(Exception):
+    __slots__ = ()
+
     @staticmethod
     def __interpersonal_exception_handler__(exc):
         return render_error(400, "Invalid grant: code_verified didn't match")
 
 
 class IndieauthMissingCodeVerifierError(Exception):
+    __slots__ = ()
+
     def __interpersonal_exception_handler__(exc):
         return render_error(400, "Missing code_verifier for S256")
 
 
 class InvalidBearerTokenError(Exception):
+    __slots__ = ("token",)
+
     def __init__(self, token):
         self.token = token
 
     def __interpersonal_exception_handler__(self):
-        return json_error(401, "unauthorized", f"Invalid bearer token '{self.token}'")
+        return templated_json_error(
+            401, "unauthorized", "Invalid bearer token '%s'", self.token
+        )
 
 
 class AuthenticationProvidedTwiceError(Exception):
@@ -92,6 +235,8 @@ class AuthenticationProvidedTwiceError(Exception):
     To account for this, only throw this exception if both are provided but do not match.
     """
 
+    __slots__ = ("auth_header_token", "body_access_token")
+
     def __init__(self, auth_header_token, body_access_token):
         self.auth_header_token = auth_header_token
         self.body_access_token = body_access_token
@@ -101,7 +246,7 @@ class AuthenticationProvidedTwiceError(Exception):
 
     def __interpersonal_exception_handler__(self):
         current_app.logger.exception(self)
-        return json_error(
+        return static_json_error(
             400,
             "bad_request",
             "Authentication was provided both in HTTP headers and request body",
@@ -109,31 +254,40 @@ class AuthenticationProvidedTwiceError(Exception):
 
 
 class MissingBearerTokenError(Exception):
+    __slots__ = ()
+
     def __interpersonal_exception_handler__(self):
-        return json_error(401, "unauthorized", "No token was provided")
+        return static_json_error(401, "unauthorized", "No token was provided")
 
 
 class MicropubInvalidRequestError(Exception):
+    __slots__ = ("desc",)
+
     def __init__(self, desc):
         self.desc = desc
 
     def __interpersonal_exception_handler__(self):
-        return json_error(400, "invalid_request", self.desc)
+        return templated_json_error(400, "invalid_request", "%s", self.desc)
 
 
 class MicropubInsufficientScopeError(Exception):
+    __slots__ = ("action",)
+
     def __init__(self, action):
         self.action = action
 
     def __interpersonal_exception_handler__(self):
-        return json_error(
+        return templated_json_error(
             403,
             "insufficient_scope",
-            f"Access token not valid for action '{self.action}'",
+            "Access token not valid for action '%s'",
+            self.action,
         )
 
 
 class MicropubBlogNotFoundError(Exception):
+    __slots__ = ("blog_name",)
+
     def __init__(self, blog_name):
         self.blog_name = blog_name
 
@@ -142,6 +296,8 @@ class MicropubBlogNotFoundError(Exception):
 
 
 class MicropubDuplicatePostError(Exception):
+    __slots__ = ("uri",)
+
     def __init__(self, uri: str = ""):
         self.uri = uri
 
@@ -149,15 +305,21 @@ class MicropubDuplicatePostError(Exception):
         return f"A post with URI <{self.uri}> already exists"
 
     def __interpersonal_exception_handler__(self):
-        return json_error(400, "invalid_request", str(self))
+        return templated_json_error(
+            400, "invalid_request", "A post with URI <%s> already exists", self.uri
+        )
 
 
 class InterpersonalNotFoundError(Exception):
+    __slots__ = ()
+
     def __interpersonal_exception_handler__(self):
         return json_error(404, "Not found", str(self))
 
 
 class InterpersonalConfigurationError(Exception):
+    __slots__ = ("msg",)
+
     def __init__(self, msg: str = ""):
         self.msg = msg
 
@@ -1,10 +1,14 @@
 """The base class for Hugo blogs"""
 
-import copy
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+import functools
 import hashlib
 import os
+import pickle
 import re
+import shutil
+import sys
 import typing
 from datetime import date, datetime
 
@@ -19,7 +23,49 @@ from interpersonal.errors import (
     MicropubDuplicatePostError,
     MicropubInvalidRequestError,
 )
-from interpersonal.util import CaseInsensitiveDict, extension_from_content_type
+from interpersonal.util import extension_from_content_type
+
+
+# Prefer the LibYAML-based loader and dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as YamlSafeDumper, CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeDumper as YamlSafeDumper, SafeLoader as YamlSafeLoader
+
+
+SLUG_NON_WORD_RE = re.compile(r"[^\w ]+")
+SLUG_SPACES_RE = re.compile(r" +")
+
+# The ASCII characters that SLUG_NON_WORD_RE removes.
+# ASCII text can be stripped of them with bytes.translate(), which is faster than the regex.
+SLUG_ASCII_NON_WORD_BYTES = bytes(
+    c for c in range(128) if not (chr(c).isalnum() or chr(c) in "_ ")
+)
+
+# HugoPostSource.fromstr() first looks for the end of the frontmatter in this many characters
+FRONTMATTER_SEARCH_CHARS = 64 * 1024
+
+# Limits on post frontmatter, checked before it is parsed.
+# Each alias stands for the whole node it refers to, and anchored nodes can themselves
+# contain aliases, so a few short lines can describe a huge document
+# (the "billion laughs" attack).
+# We limit the number of nodes that aliases expand to, rather than the number of aliases.
+MAX_FRONTMATTER_CHARS = 256 * 1024
+MAX_FRONTMATTER_ALIAS_NODES = 4096
+
+# Parsed frontmatter is cached for at most this many posts,
+# and frontmatter longer than this many characters is parsed every time instead.
+FRONTMATTER_CACHE_SIZE = 128
+MAX_CACHED_FRONTMATTER_CHARS = 16 * 1024
+
+# Uploaded media is hashed and copied in chunks of this size
+MEDIA_READ_CHUNK_BYTES = 1024 * 1024
+
+# The most threads to use for hashing several uploads at once
+MEDIA_HASH_MAX_WORKERS = 8
+
+# slugify() is sometimes passed an entire post body, but only uses the first few words
+SLUG_MAX_INPUT_CHARS = 256
 
 
 def slugify(text: str) -> str:
@@ -30,14 +76,55 @@ def slugify(text: str) -> str:
     if not text:
         # Return a date
         return datetime.now().strftime("%Y%m%d-%H%M")
+    # Only the first 11 words are used, so don't lowercase or split the rest of the text.
+    # Truncating before the cache lookup also keeps whole post bodies out of the cache.
+    return _slugify_text(text[0:SLUG_MAX_INPUT_CHARS])
+
+
+@functools.lru_cache(maxsize=1024)
+def _slugify_text(text: str) -> str:
+    """Create a URL slug from non-empty text
+
+    The result depends only on the text, so it is cached;
+    clients that retry a post will send the same name or content again.
+    """
+    lower = text.lower()
+    words = lower.split(" ", 11)
+    basis = words[0:11]
+    rejoined = " ".join(basis)
+    if rejoined.isascii():
+        no_non_word_chars = (
+            rejoined.encode("ascii")
+            .translate(None, SLUG_ASCII_NON_WORD_BYTES)
+            .decode("ascii")
+        )
     else:
-        lower = text.lower()
-        words = lower.split(" ")
-        basis = words[0:11]
-        rejoined = " ".join(basis)
-        no_non_word_chars = re.sub(r"[^\w ]+", "", rejoined)
-        no_spaces = re.sub(" +", "-", no_non_word_chars)
-        return no_spaces
+        no_non_word_chars = SLUG_NON_WORD_RE.sub("", rejoined)
+    no_spaces = SLUG_SPACES_RE.sub("-", no_non_word_chars)
+    return no_spaces
+
+
+if sys.version_info >= (3, 11):
+    # Python 3.11 accepts a trailing Z for UTC
+    parse_isoformat = datetime.fromisoformat
+else:
+
+    def parse_isoformat(value: str) -> datetime:
+        """Parse an ISO 8601 date, which may use a trailing Z for UTC"""
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def frontmatter_datetime(value: typing.Union[str, date, datetime]) -> datetime:
+    """Get a datetime from a frontmatter date
+
+    YAML parses unquoted dates and timestamps itself,
+    and we also accept ISO 8601 strings.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return parse_isoformat(value)
 
 
 def normalize_baseuri(baseuri: str) -> str:
@@ -45,12 +132,12 @@ def normalize_baseuri(baseuri: str) -> str:
 
     If it doesn't end in a slash, add one.
     """
-    if baseuri[-1] != "/":
-        return baseuri + "/"
-    return baseuri
+    if baseuri.endswith("/"):
+        return baseuri
+    return baseuri + "/"
 
 
-@dataclass
+@dataclass(slots=True)
 class AddedMediaItem:
     """A media item added to the blog
 
@@ -63,6 +150,100 @@ class AddedMediaItem:
     created: bool
 
 
+# Content types that a post's mf2 content may be given as
+MF2_CONTENT_TYPES = frozenset(("html", "markdown"))
+
+# Frontmatter keys that map to single valued mf2 properties
+MF2_SINGLE_VALUE_FRONTMATTER_KEYS = {"title": "name", "description": "summary"}
+
+# Frontmatter keys that map to mf2 date properties
+MF2_DATE_FRONTMATTER_KEYS = {"date": "published", "updated": "updated"}
+
+
+def _copy_frontmatter_value(value):
+    """Copy a frontmatter value so that mf2json doesn't share lists or dicts with it
+
+    Only the top level is copied, so anything nested inside is still shared.
+    """
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def check_frontmatter_limits(yaml_raw: str):
+    """Reject frontmatter that is too large or whose aliases expand to too many nodes
+
+    Aliases need an anchor, so only frontmatter containing '&' is scanned for them.
+    The scan uses the YAML parser's event stream, which doesn't build any objects.
+    It records the expanded size of every anchored node,
+    counting a collection as itself plus everything inside it (including its own aliases),
+    and adds that size up each time the anchor is aliased.
+    """
+    if len(yaml_raw) > MAX_FRONTMATTER_CHARS:
+        raise MicropubInvalidRequestError(
+            f"Post frontmatter is longer than {MAX_FRONTMATTER_CHARS} characters"
+        )
+    if "&" not in yaml_raw:
+        return
+    anchor_sizes: typing.Dict[str, int] = {}
+    # One [anchor, size] entry per collection that is still open
+    open_collections: typing.List[typing.List] = []
+    alias_nodes = 0
+    for event in yaml.parse(yaml_raw, YamlSafeLoader):
+        if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+            open_collections.append([event.anchor, 1])
+            continue
+        if isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+            anchor, size = open_collections.pop()
+        elif isinstance(event, yaml.ScalarEvent):
+            anchor, size = event.anchor, 1
+        elif isinstance(event, yaml.AliasEvent):
+            anchor, size = None, anchor_sizes.get(event.anchor, 1)
+            alias_nodes += size
+            if alias_nodes > MAX_FRONTMATTER_ALIAS_NODES:
+                raise MicropubInvalidRequestError(
+                    f"Post frontmatter aliases expand to more than {MAX_FRONTMATTER_ALIAS_NODES} nodes"
+                )
+        else:
+            continue
+        if anchor is not None:
+            anchor_sizes[anchor] = size
+        if open_collections:
+            open_collections[-1][1] += size
+
+
+def _load_frontmatter(yaml_raw: str) -> dict:
+    """Parse YAML frontmatter, with lowercased keys"""
+    check_frontmatter_limits(yaml_raw)
+    # Lowercase the keys once here, so that lookups are plain dict lookups.
+    # Empty frontmatter parses to None.
+    return {
+        k.lower() if isinstance(k, str) else k: v
+        for k, v in (yaml.load(yaml_raw, YamlSafeLoader) or {}).items()
+    }
+
+
+@functools.lru_cache(maxsize=FRONTMATTER_CACHE_SIZE)
+def _pickled_frontmatter(yaml_raw: str) -> bytes:
+    return pickle.dumps(_load_frontmatter(yaml_raw), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _parse_frontmatter(yaml_raw: str) -> dict:
+    """Parse YAML frontmatter, with lowercased keys
+
+    Posts are retrieved again for duplicate checks and q=source queries,
+    so the result is cached on the raw YAML.
+    The cache holds pickled bytes, which can't be modified,
+    and unpickling builds a new dict for each caller in C,
+    several times faster than copy.deepcopy() of a cached dict.
+    """
+    if len(yaml_raw) > MAX_CACHED_FRONTMATTER_CHARS:
+        return _load_frontmatter(yaml_raw)
+    return pickle.loads(_pickled_frontmatter(yaml_raw))
+
+
 class HugoPostSource:
     def __init__(self, frontmatter: dict, content: str):
         self.frontmatter = frontmatter
@@ -73,6 +254,7 @@ class HugoPostSource:
         """Create a post from the string contents fo a file
 
         Pass in the post content as a string, including YAML frontmatter and post body.
+        Frontmatter keys are lowercased.
         """
         post_content = post_content.strip()
 
@@ -84,10 +266,14 @@ class HugoPostSource:
             return cls({}, post_content)
 
         yaml_start_idx = len(yaml_start_str)
-        yaml_end_idx = post_content.index(yaml_end_str)
+        # The frontmatter is at the top of the post,
+        # so look for its end there before searching the whole body
+        yaml_end_idx = post_content.find(yaml_end_str, 0, FRONTMATTER_SEARCH_CHARS)
+        if yaml_end_idx == -1:
+            yaml_end_idx = post_content.index(yaml_end_str)
         yaml_raw = post_content[yaml_start_idx:yaml_end_idx]
 
-        frontmatter = CaseInsensitiveDict(yaml.load(yaml_raw, yaml.Loader))
+        frontmatter = _parse_frontmatter(yaml_raw)
 
         content_start_idx = yaml_end_idx + len(yaml_end_str)
         body = post_content[content_start_idx:]
@@ -95,50 +281,45 @@ class HugoPostSource:
         return cls(frontmatter, body)
 
     def tostr(self) -> str:
-        return "---\n{}---\n\n{}\n".format(yaml.dump(self.frontmatter), self.content)
+        # The safe dumper can't represent dict subclasses
+        frontmatter = yaml.dump(dict(self.frontmatter), Dumper=YamlSafeDumper)
+        return "---\n{}---\n\n{}\n".format(frontmatter, self.content)
 
-    @property
+    @functools.cached_property
     def mf2json(self):
         """Return a microformats2-parsing JSON object for the post
 
         https://microformats.org/wiki/microformats2-parsing
+
+        The result is computed once per post.
         """
-        fm = copy.deepcopy(self.frontmatter)
-        props = {}
-        for k, v in fm.get("extra", {}).items():
-            props[k.replace("_", "-")] = v
-        if "title" in fm:
-            props["name"] = [fm["title"]]
-            del fm["title"]
-        if "description" in fm:
-            props["summary"] = [fm["description"]]
-            del fm["description"]
-        if "date" in fm:
-            pubdate = fm["date"]
-            if type(pubdate) == date:
-                pubdate = datetime(pubdate.year, pubdate.month, pubdate.day)
-            if not isinstance(pubdate, datetime):
-                pubdate = datetime.fromisoformat(pubdate.replace("Z", "+00:00"))
-            props["published"] = [pubdate.isoformat(timespec="seconds")]
-            del fm["date"]
-        if "updated" in fm:
-            if not isinstance(fm["updated"], datetime):
-                fm["updated"] = datetime.fromisoformat(
-                    fm["updated"].replace("Z", "+00:00")
-                )
-            props["updated"] = [fm["updated"].isoformat(timespec="seconds")]
-            del fm["updated"]
-        if "tags" in fm:
-            props["category"] = fm["tags"]
-            del fm["tags"]
-        for k, v in fm.items():
-            props[k] = v
-        if len(self.content.strip()) > 0:
+        # Build the properties in a single pass over the frontmatter.
+        # Properties from "extra" are overridden by the well known frontmatter keys,
+        # which are in turn overridden by any other frontmatter keys.
+        extra = {}
+        known = {}
+        rest = {}
+        for k, v in self.frontmatter.items():
+            if k in MF2_SINGLE_VALUE_FRONTMATTER_KEYS:
+                known[MF2_SINGLE_VALUE_FRONTMATTER_KEYS[k]] = [v]
+            elif k in MF2_DATE_FRONTMATTER_KEYS:
+                date_value = frontmatter_datetime(v).isoformat(timespec="seconds")
+                known[MF2_DATE_FRONTMATTER_KEYS[k]] = [date_value]
+            elif k == "tags":
+                known["category"] = _copy_frontmatter_value(v)
+            else:
+                if k == "extra":
+                    for extra_k, extra_v in v.items():
+                        extra[extra_k.replace("_", "-")] = extra_v
+                rest[k] = _copy_frontmatter_value(v)
+        props = {**extra, **known, **rest}
+        # isspace() stops at the first non-whitespace character, without copying the content
+        if self.content and not self.content.isspace():
             props["content"] = [{"markdown": self.content}]
         return {"properties": props}
 
 
-@dataclass
+@dataclass(slots=True)
 class HugoDirectories:
     """Directories used by Hugo"""
 
@@ -146,23 +327,70 @@ class HugoDirectories:
     static: str
 
 
+def _new_sha256():
+    return hashlib.sha256(usedforsecurity=False)
+
+
+def sha256_stream(stream: typing.BinaryIO):
+    """Hash a whole binary stream, returning the hash object
+
+    The stream is rewound to its start first.
+    hashlib.file_digest() (Python 3.11+) hashes the stream in C without a Python loop,
+    but hashes in-memory streams directly from their whole buffer whatever their position,
+    so the rewind keeps both paths hashing the same bytes.
+    """
+    stream.seek(0)
+    if hasattr(hashlib, "file_digest") and hasattr(stream, "readinto"):
+        return hashlib.file_digest(stream, _new_sha256)
+    hash = _new_sha256()
+    while chunk := stream.read(MEDIA_READ_CHUNK_BYTES):
+        hash.update(chunk)
+    return hash
+
+
 class OpaqueFile:
-    """A simple file class for e.g. uploaded files."""
+    """A simple file class for e.g. uploaded files.
+
+    The upload is hashed in chunks as it is read,
+    and its contents are only read into memory if something asks for them.
+    save() copies it to disk without reading it all into memory.
+
+    The upload stream is closed once the request is finished,
+    so anything that keeps an OpaqueFile past the request
+    must read its contents before then.
+    """
 
     def __init__(self, file_storage: FileStorage):
-        self.contents = file_storage.read()
+        self._stream = file_storage.stream
 
         self.content_type = file_storage.content_type
         self._uploaded_filename_UNSAFE = file_storage.filename or None
 
-        hash = hashlib.sha256(usedforsecurity=False)
-        hash.update(self.contents)
+        hash = sha256_stream(self._stream)
         self.digest = hash.digest()
         self.hexdigest = hash.hexdigest()
 
-    @property
+    @functools.cached_property
+    def contents(self) -> bytes:
+        """The contents of the file"""
+        self._stream.seek(0)
+        return self._stream.read()
+
+    def save(self, path: str, exclusive: bool = False):
+        """Save the file to a path on the local filesystem
+
+        If exclusive is True, raise FileExistsError if the path already exists.
+        """
+        self._stream.seek(0)
+        with open(path, "xb" if exclusive else "wb") as fp:
+            shutil.copyfileobj(self._stream, fp, MEDIA_READ_CHUNK_BYTES)
+
+    @functools.cached_property
     def filename(self) -> str:
-        """Get the filename to use when storing a media item"""
+        """Get the filename to use when storing a media item
+
+        Computed once, as it is used to build several URIs and paths for each item.
+        """
         if self._uploaded_filename_UNSAFE:
             secname = secure_filename(self._uploaded_filename_UNSAFE)
             basename = os.path.splitext(os.path.basename(secname))[0]
@@ -241,6 +469,15 @@ class HugoBase:
         self.mediastaging = mediastaging
         self.dirs = HugoDirectories("content", "static")
 
+        # URI prefixes for media items, which only depend on the settings above
+        self._mediadir_uri_prefix = f"{self.baseuri}{self.mediaprefix}/"
+        self._staging_uri_prefix = (
+            f"{self.interpersonal_uri}micropub/{self.name}/staging/"
+        )
+        self._staged_media_uri_prefix = (
+            f"{self.interpersonal_uri}micropub/{self.name}/media/"
+        )
+
     def _uri_to_post_bundle_dir(self, uri) -> str:
         """Map a URI to a post's bundle directory in the Hugo source.
 
@@ -249,11 +486,8 @@ class HugoBase:
         Note that it returns just a directory like content/post_slug/,
         and doesn't include any index.md or index.html etc.
         """
-        baseuri_escd = re.escape(self.baseuri)
-        baseuri_re = f"^{baseuri_escd}/*"
-        hugo_bundle_subpath = re.sub(baseuri_re, "", uri)
-        if hugo_bundle_subpath.startswith("/"):
-            hugo_bundle_subpath = hugo_bundle_subpath[1:]
+        # Strip all leading slashes, so that os.path.join() never sees an absolute path
+        hugo_bundle_subpath = uri.removeprefix(self.baseuri).lstrip("/")
         hugo_bundle_path = os.path.join("content", hugo_bundle_subpath)
         return hugo_bundle_path
 
@@ -265,6 +499,22 @@ class HugoBase:
         raw_post = self._get_raw_post_body(uri)
         return HugoPostSource.fromstr(raw_post)
 
+    def _post_exists(self, uri) -> bool:
+        """Return True if a post exists at the URI
+
+        By default, this retrieves and parses the post.
+        Subclasses should override it with a check that doesn't retrieve the post body.
+        """
+        try:
+            self.get_post(uri)
+        except BaseException as exc:
+            current_app.logger.debug(
+                f"Could not .get_post({uri}) due to error '{exc}'. Assuming this is correct and moving on...",
+                exc_info=exc,
+            )
+            return False
+        return True
+
     def add_post(
         self,
         slug: str,
@@ -295,15 +545,7 @@ class HugoBase:
         # Each blog should probably define how slugs should be handled -
         # require the client to send it, generate it from title/content, generate it from the date, something else?
         posturi = self._post_uri(slug, section)
-        oldpost = None
-        try:
-            oldpost = self.get_post(posturi)
-        except BaseException as exc:
-            current_app.logger.debug(
-                f"Could not .get_post({posturi}) due to error '{exc}'. Assuming this is correct and moving on...",
-                exc_info=exc,
-            )
-        if oldpost is not None:
+        if self._post_exists(posturi):
             raise MicropubDuplicatePostError(uri=posturi)
 
         if media and self.mediastaging:
@@ -327,37 +569,38 @@ class HugoBase:
         """
         content = ""
         content_type = ""
-        frontmatter = {}
-        slug = ""
         name = ""
         section = self.sectionmap.default
         props = mf2obj["properties"]
-        for k, v in props.items():
-            if k == "content":
-                if len(v) > 1:
+
+        # Pull out the properties that need special handling;
+        # everything else goes into the frontmatter as is
+        frontmatter = dict(props)
+        content_list = frontmatter.pop("content", None)
+        slug = (frontmatter.pop("slug", None) or [""])[0]
+        name_list = frontmatter.pop("name", None)
+        if name_list:
+            name = frontmatter["title"] = name_list[0]
+
+        if content_list:
+            if len(content_list) > 1:
+                raise MicropubInvalidRequestError(
+                    "Unexpectedly multiple values in content list"
+                )
+            unwrappedv = content_list[0]
+            if type(unwrappedv) is dict:
+                if len(unwrappedv) > 1:
+                    raise MicropubInvalidRequestError(
+                        "Unexpectedly multiple values in content dict"
+                    )
+                content_type, content = next(iter(unwrappedv.items()))
+                if content_type not in MF2_CONTENT_TYPES:
                     raise MicropubInvalidRequestError(
-                        "Unexpectedly multiple values in content list"
+                        f"Unexpected content type {content_type}"
                     )
-                unwrappedv = v[0]
-                if type(unwrappedv) is dict:
-                    if len(unwrappedv) > 1:
-                        raise MicropubInvalidRequestError(
-                            "Unexpectedly multiple values in content dict"
-                        )
-                    content_type, content = list(unwrappedv.items())[0]
-                    if content_type not in ["html", "markdown"]:
-                        raise MicropubInvalidRequestError(
-                            f"Unexpected content type {content_type}"
-                        )
-                else:
-                    content = unwrappedv
-            elif k == "slug":
-                slug = v[0]
-            elif k == "name":
-                name = v[0]
-                frontmatter["title"] = v[0]
             else:
-                frontmatter[k] = v
+                content = unwrappedv
+
         if not slug:
             slug = slugify(name or content)
         if "date" not in props:
@@ -384,7 +627,15 @@ class HugoBase:
 
         media:      A list of werkzeug FileStorage objects
         """
-        processed_media = [OpaqueFile(m) for m in media]
+        if len(media) > 1:
+            # hashlib releases the GIL while hashing,
+            # so several uploads can be read and hashed at the same time
+            with ThreadPoolExecutor(
+                max_workers=min(MEDIA_HASH_MAX_WORKERS, len(media))
+            ) as executor:
+                processed_media = list(executor.map(OpaqueFile, media))
+        else:
+            processed_media = [OpaqueFile(m) for m in media]
         return self._add_media(processed_media)
 
     def _post_path(self, slug: str, section: str) -> str:
@@ -481,7 +732,7 @@ class HugoBase:
         For sites that use Staged Media Mode.
         This is the permanent URI, and it does not change after being uploaded.
         """
-        return f"{self.baseuri}{self.mediaprefix}/{media_item.hexdigest}/{media_item.filename}"
+        return f"{self._mediadir_uri_prefix}{media_item.hexdigest}/{media_item.filename}"
 
     def _media_item_uri_staging(self, media_item: OpaqueFile) -> str:
         """Get the staging URI for a media item
@@ -489,7 +740,7 @@ class HugoBase:
         For sites that use Staged Media Mode.
         Return a temporary URI that is valid until media is collected.
         """
-        return f"{self.interpersonal_uri}micropub/{self.name}/staging/{media_item.hexdigest}/{media_item.filename}"
+        return f"{self._staging_uri_prefix}{media_item.hexdigest}/{media_item.filename}"
 
     def _media_item_uri_collected(
         self, slug: str, section: str, media_item: typing.Union[OpaqueFile, str]
@@ -505,9 +756,13 @@ class HugoBase:
         and the file hash and filename are extracted from it.
         """
         if type(media_item) is str:
-            splituri = media_item.split("/")
-            digest = splituri[-2]
-            filename = splituri[-1]
+            # The last two path components, without splitting the whole URI
+            last = media_item.rfind("/")
+            if last == -1:
+                raise ValueError(f"Not a staging URI: {media_item}")
+            prev = media_item.rfind("/", 0, last)
+            digest = media_item[prev + 1 : last]
+            filename = media_item[last + 1 :]
         else:
             digest = media_item.hexdigest
             filename = media_item.filename
@@ -540,17 +795,19 @@ class HugoBase:
         result: typing.List[AddedMediaItem] = []
         for item in media:
             digest = item.hexdigest
+            filename = item.filename
             parent = os.path.join(self.mediastaging, digest)
-            path = os.path.join(parent, item.filename)
-            if os.path.exists(path):
-                created = False
-            else:
+            path = os.path.join(parent, filename)
+            # The parent may exist if the same file was uploaded with a different name
+            os.makedirs(parent, exist_ok=True)
+            # Creating the file exclusively checks whether it exists in the same syscall,
+            # and two requests uploading the same file can't both write it
+            try:
+                item.save(path, exclusive=True)
                 created = True
-                parent = os.path.split(path)[0]
-                os.makedirs(parent)
-                with open(path, "wb") as fp:
-                    fp.write(item.contents)
-            uri = f"{self.interpersonal_uri}micropub/{self.name}/media/{digest}/{item.filename}"
+            except FileExistsError:
+                created = False
+            uri = f"{self._staged_media_uri_prefix}{digest}/{filename}"
             result.append(AddedMediaItem(uri, created))
 
         return result
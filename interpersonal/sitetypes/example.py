@@ -2,7 +2,6 @@
 
 import os
 import os.path
-import re
 import textwrap
 import typing
 
@@ -95,11 +94,18 @@ class HugoExampleBlog(base.HugoBase):
             mediastaging=mediastaging,
         )
 
-    def _get_raw_post_body(self, uri: str) -> str:
-        path = re.sub(re.escape(self.baseuri), "", uri)
+    def _uri_to_post_key(self, uri: str) -> str:
+        """Get the key for a post in self.posts from its URI"""
+        path = uri.removeprefix(self.baseuri)
         if not path.startswith("/"):
             path = f"/{path}"
-        return self.posts[path]
+        return path
+
+    def _get_raw_post_body(self, uri: str) -> str:
+        return self.posts[self._uri_to_post_key(uri)]
+
+    def _post_exists(self, uri: str) -> bool:
+        return self._uri_to_post_key(uri) in self.posts
 
     def _add_raw_post_body(
         self, slug: str, raw_body: str, section: str, body_type: str = ""
@@ -127,8 +133,10 @@ class HugoExampleBlog(base.HugoBase):
             if os.path.exists(item_path):
                 created = False
             else:
-                with open(item_path, "wb") as fp:
-                    fp.write(item.contents)
+                item.save(item_path)
+                # Read the contents now, as the upload stream is closed after the request
+                # and these items are kept around for later requests.
+                _ = item.contents
                 self.media[uri] = item
                 created = True
             items.append(base.AddedMediaItem(uri, created))
@@ -152,6 +160,6 @@ class HugoExampleBlog(base.HugoBase):
 
             new_uri = self._media_item_uri_collected(postslug, section, staging_uri)
             self.collectedmedia[new_uri] = self.media[staging_uri]
-            postbody = re.sub(re.escape(staging_uri), new_uri, postbody)
+            postbody = postbody.replace(staging_uri, new_uri)
 
         return postbody
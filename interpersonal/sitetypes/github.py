@@ -3,7 +3,6 @@
 import base64
 import json
 import os.path
-import re
 import time
 import typing
 from datetime import datetime
@@ -273,6 +272,19 @@ class HugoGithubRepo(base.HugoBase):
         )
         return content
 
+    def _post_exists(self, uri: str) -> bool:
+        """Check for a post by listing its bundle directory
+
+        This is a single request that doesn't transfer the post itself,
+        rather than fetching index.md and then index.html.
+        """
+        listing = self._get_repo_file_if_exists(self._uri_to_post_bundle_dir(uri))
+        # A missing path returns None, and a file returns a single dict.
+        # A directory returns a list (a fastcore L, which is not a list subclass).
+        if not listing or isinstance(listing, dict):
+            return False
+        return any(entry["name"] in ("index.md", "index.html") for entry in listing)
+
     def _add_raw_post_body(
         self, slug: str, raw_body: str, section: str, body_type: str = ""
     ) -> str:
@@ -378,11 +390,9 @@ class HugoGithubRepo(base.HugoBase):
             it holds media files temporarily on its own server,
             so this is only useful in remote media dir mode.
         """
+        uri_prefix = f"https://raw.githubusercontent.com/{self.owner}/{self.repo}/{self.branch}/content/"
         for uri in uris:
-            esc_uri_prefix = re.escape(
-                f"https://raw.githubusercontent.com/{self.owner}/{self.repo}/{self.branch}/content/"
-            )
-            relpath = re.sub(esc_uri_prefix, "", uri)
+            relpath = uri.removeprefix(uri_prefix)
 
             # Get the file so that we can reference its sha
             get_resp = self._logged_api(
@@ -419,7 +429,7 @@ class HugoGithubRepo(base.HugoBase):
             if not os.path.exists(localpath):
                 raise InterpersonalNotFoundError(localpath)
             new_uri = self._media_item_uri_collected(postslug, section, staging_uri)
-            postbody = re.sub(re.escape(staging_uri), new_uri, postbody)
+            postbody = postbody.replace(staging_uri, new_uri)
 
             repofile = self._get_repo_file_if_exists(repopath)
             if repofile:
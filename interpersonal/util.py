@@ -1,5 +1,6 @@
 """Interpersonal utility functions"""
 
+from itertools import chain
 from urllib.parse import parse_qs, urlencode, urlparse
 import typing
 
@@ -107,7 +108,7 @@ class CaseInsensitiveDict(dict):
 
 def listflatten(lists) -> typing.List:
     """Given a list of lists, return a flattened single list"""
-    return [val for sublist in lists for val in sublist]
+    return list(chain.from_iterable(lists))
 
 
 def extension_from_content_type(content_type: str) -> str:
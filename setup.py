@@ -14,7 +14,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/mrled/interpersonal/",
     packages=["interpersonal"],
-    python_requires=">=3.6",
+    python_requires=">=3.10",
     include_package_data=True,
     install_requires=[
         "certifi",
@@ -22,6 +22,7 @@ setuptools.setup(
         "cryptography",
         "flask",
         "ghapi @ git+https://github.com/fastai/ghapi.git@d8fb5c2#egg=ghapi",
+        "orjson",
         "pyjwt[crypto]",
         "pytest",
         "pyyaml",
@@ -415,3 +415,37 @@ def test_bearer_POST(indieauthfix: IndieAuthActions, testconstsfix: TestConsts):
 
     assert response_json["me"] == testconstsfix.blog_uri
     assert response_json["scope"] == "create"
+
+
+def test_bearer_POST_revoke(
+    app: Flask,
+    client: FlaskClient,
+    indieauthfix: IndieAuthActions,
+    testconstsfix: TestConsts,
+):
+    """Revoking a token should stop it from verifying, even if it was cached"""
+    z2btd = indieauthfix.zero_to_bearer_with_test_data()
+
+    with app.app_context():
+        app.config["BEARER_TOKEN_CACHE"].ttl = 60
+        verified = indieauth.bearer_verify_token(z2btd.btoken, testconstsfix.blog_uri)
+        assert verified["client_id"] == z2btd.client_id
+
+    resp = client.post(
+        "/indieauth/bearer/example-blog",
+        data={"action": "revoke", "token": z2btd.btoken},
+    )
+    assert resp.status_code == 200
+
+    with app.app_context():
+        with pytest.raises(indieauth.InvalidBearerTokenError):
+            indieauth.bearer_verify_token(z2btd.btoken, testconstsfix.blog_uri)
+
+
+def test_get_auth_header_token():
+    """Only a leading 'Bearer ' should be removed from the Authorization header"""
+    assert indieauth.get_auth_header_token("Bearer abc123") == "abc123"
+    assert indieauth.get_auth_header_token("Bearer abcBearer 123") == "abcBearer 123"
+    assert indieauth.get_auth_header_token("abc123") == "abc123"
+    assert indieauth.get_auth_header_token("") == ""
+    assert indieauth.get_auth_header_token(None) == ""
@@ -0,0 +1,34 @@
+"""Tests for the verified bearer token cache"""
+
+from interpersonal.blueprints.indieauth.verify_cache import VerifiedBearerTokenCache
+
+
+def test_verify_cache_disabled():
+    cache = VerifiedBearerTokenCache(0)
+    cache.set("tok", "https://blog.example.org/", {"me": "whatever"})
+    assert cache.get("tok", "https://blog.example.org/") is None
+
+
+def test_verify_cache_get_set_invalidate():
+    me = "https://blog.example.org/"
+    value = {"me": me, "client_id": "https://client.example.net/", "scopes": []}
+    cache = VerifiedBearerTokenCache(60)
+    assert cache.get("tok", me) is None
+    cache.set("tok", me, value)
+    assert cache.get("tok", me) is value
+    assert cache.get("tok", "https://other.example.org/") is None
+    cache.invalidate("tok")
+    assert cache.get("tok", me) is None
+
+
+def test_verify_cache_lru_eviction():
+    me = "https://blog.example.org/"
+    cache = VerifiedBearerTokenCache(60, maxsize=2)
+    cache.set("one", me, 1)
+    cache.set("two", me, 2)
+    # Touch "one" so that "two" is the least recently used
+    assert cache.get("one", me) == 1
+    cache.set("three", me, 3)
+    assert cache.get("one", me) == 1
+    assert cache.get("two", me) is None
+    assert cache.get("three", me) == 3
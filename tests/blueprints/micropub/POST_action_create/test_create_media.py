@@ -1,5 +1,5 @@
 import json
-from urllib.parse import quote, urlencode
+from urllib.parse import urlencode
 
 from flask.app import Flask
 from flask.testing import FlaskClient
@@ -40,7 +40,7 @@ def test_action_create_with_photo_from_uri(
                 "h": "entry",
                 "content": post_content,
                 "slug": slug,
-                "photo": quote(photo_uri),
+                "photo": photo_uri,
             },
             headers=headers,
         )
@@ -6,6 +6,7 @@ from flask.app import Flask
 from flask.testing import FlaskClient
 from werkzeug.datastructures import Headers, MultiDict
 
+from interpersonal.blueprints.micropub import form_body_to_mf2_json
 from tests.conftest import IndieAuthActions, TestConsts
 
 
@@ -488,3 +489,28 @@ def test_action_create_post_json_nested_checkin(
         except BaseException:
             print(f"Failing test. Response body: {getresp.data}")
             raise
+
+
+def test_form_body_to_mf2_json_reserved_and_list_keys():
+    """Reserved keys are dropped, and tag[] values merge with bare tag values
+
+    Values are used as-is; werkzeug has already decoded them.
+    """
+    body = MultiDict(
+        [
+            ("h", "entry"),
+            ("access_token", "secret"),
+            ("mp-slug", "a-slug"),
+            ("content", "100%25 a+b"),
+            ("category", "one"),
+            ("category[]", "two"),
+            ("category[]", "three"),
+        ]
+    )
+    assert form_body_to_mf2_json(body) == {
+        "type": ["h-entry"],
+        "properties": {
+            "content": ["100%25 a+b"],
+            "category": ["one", "two", "three"],
+        },
+    }
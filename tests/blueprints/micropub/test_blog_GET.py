@@ -61,6 +61,15 @@ def test_micropub_blog_endpoint_GET_config(
             == "http://localhost/micropub/example-blog/media"
         )
 
+        # Responses are cached per app, and other hosts can't grow the cache without bound
+        for i in range(100):
+            client.get(
+                "/micropub/example-blog?q=config",
+                headers=headers,
+                base_url=f"http://host{i}.example.com",
+            )
+        assert len(app.extensions["interpersonal_micropub_config"]) == 64
+
 
 def test_micropub_blog_endpoint_GET_source_valid_url(
     app: Flask,
@@ -1,6 +1,6 @@
 """Tests for the database code"""
 
-
+import datetime
 import sqlite3
 
 import pytest
@@ -8,15 +8,104 @@ import pytest
 from interpersonal import database
 
 
-def test_get_close_db(app):
+def test_get_db_reused(app):
     with app.app_context():
         db = database.get_db()
         assert db is database.get_db()
 
-    with pytest.raises(sqlite3.ProgrammingError) as e:
-        db.execute("SELECT 1")
+    # The connection stays open after the app context ends,
+    # and is reused by the next one on the same thread
+    assert db.execute("SELECT 1").fetchone()[0] == 1
+    with app.app_context():
+        assert db is database.get_db()
+
+
+def test_close_db_discards_uncommitted(app):
+    with app.app_context():
+        db = database.get_db()
+        db.execute(
+            "INSERT INTO BearerToken(bearerToken, time, authTokenUsed, clientId, scopes, host) VALUES ('tok', 0, 'code', 'cid', 'create', 'host');"
+        )
+        assert db.in_transaction
+
+    assert not db.in_transaction
+    count = db.execute(
+        "SELECT COUNT(*) FROM BearerToken WHERE bearerToken = 'tok';"
+    ).fetchone()[0]
+    assert count == 0
+
+
+def test_insert_sql(app):
+    """The INSERT statements should be valid against the schema"""
+    with app.app_context():
+        db = database.get_db()
+        db.execute(
+            database.INSERT_AUTHORIZATION_CODE_SQL,
+            ("code", 0, "cid", "redir", "state", "", "", "create", "host"),
+        )
+        db.execute(
+            database.INSERT_BEARER_TOKEN_SQL,
+            ("tok", 0, "code", "cid", "create", "host"),
+        )
+        db.commit()
+        row = db.execute(
+            "SELECT authTokenUsed, revoked FROM BearerToken WHERE bearerToken = 'tok';"
+        ).fetchone()
+        assert row["authTokenUsed"] == "code"
+        assert not row["revoked"]
+
+
+def test_init_db_current_schema_noop(app):
+    with app.app_context():
+        db = database.get_db()
+        assert (
+            db.execute("PRAGMA user_version;").fetchone()[0]
+            == database.SCHEMA_VERSION
+        )
+        db.execute("DROP TABLE BearerToken;")
+        db.commit()
+        database.init_db()
+        table = db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'BearerToken';"
+        ).fetchone()
+        assert table is None
+
+
+def test_sweep_expired(app):
+    now = datetime.datetime.utcnow()
+    old = now - datetime.timedelta(hours=1)
+    with app.app_context():
+        db = database.get_db()
+        for code, time in (("fresh", now), ("used", now), ("old", old)):
+            db.execute(
+                database.INSERT_AUTHORIZATION_CODE_SQL,
+                (code, time, "cid", "redir", "state", "", "", "create", "host"),
+            )
+        db.execute(
+            "UPDATE AuthorizationCode SET used = TRUE WHERE authorizationCode = 'used';"
+        )
+        # Enough expired codes to free many pages when they are deleted
+        for i in range(500):
+            db.execute(
+                database.INSERT_AUTHORIZATION_CODE_SQL,
+                (f"old{i}", old, "cid", "redir", "x" * 1000, "", "", "create", "host"),
+            )
+        for token in ("valid", "revoked"):
+            db.execute(
+                database.INSERT_BEARER_TOKEN_SQL,
+                (token, old, "code", "cid", "create", "host"),
+            )
+        db.execute(
+            "UPDATE BearerToken SET revoked = TRUE WHERE bearerToken = 'revoked';"
+        )
+        db.commit()
 
-    assert "closed" in str(e.value)
+        assert database.sweep_expired(db) == (502, 1)
+        assert db.execute("PRAGMA freelist_count;").fetchone()[0] == 0
+        codes = db.execute("SELECT authorizationCode FROM AuthorizationCode;")
+        assert [row[0] for row in codes] == ["fresh"]
+        tokens = db.execute("SELECT bearerToken FROM BearerToken;")
+        assert [row[0] for row in tokens] == ["valid"]
 
 
 def test_init_db_command(runner, monkeypatch):
@@ -30,3 +119,93 @@ def test_init_db_command(runner, monkeypatch):
     result = runner.invoke(args=["init-db"])
     assert "Initialized" in result.output
     assert Recorder.called
+
+
+def test_init_db_migrates_rowid_tables(app):
+    with app.app_context():
+        db = database.get_db()
+        db.executescript(
+            """
+            DROP TABLE BearerToken;
+            CREATE TABLE BearerToken(
+              bearerToken TEXT PRIMARY KEY,
+              time TIMESTAMP NOT NULL,
+              authTokenUsed TEXT NOT NULL,
+              clientId TEXT NOT NULL,
+              scopes TEXT NOT NULL,
+              host TEXT NOT NULL,
+              revoked boolean DEFAULT FALSE
+            );
+            """
+        )
+        db.execute(
+            database.INSERT_BEARER_TOKEN_SQL,
+            ("tok", 0, "code", "cid", "create", "host"),
+        )
+        db.execute("PRAGMA user_version = 0;")
+        db.commit()
+
+        database.init_db()
+
+        for table in database.SCHEMA_TABLES:
+            sql = db.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?;",
+                (table,),
+            ).fetchone()["sql"]
+            assert "WITHOUT ROWID" in sql
+        row = db.execute(
+            "SELECT authTokenUsed FROM BearerToken WHERE bearerToken = 'tok';"
+        ).fetchone()
+        assert row["authTokenUsed"] == "code"
+
+
+def test_init_db_failed_migration_rolls_back(app):
+    with app.app_context():
+        db = database.get_db()
+        # An extra column means the rows can't be copied into the new table
+        db.executescript(
+            """
+            DROP TABLE BearerToken;
+            CREATE TABLE BearerToken(bearerToken TEXT PRIMARY KEY, extra TEXT);
+            INSERT INTO BearerToken VALUES ('tok', 'extra');
+            PRAGMA user_version = 0;
+            """
+        )
+
+        with pytest.raises(sqlite3.OperationalError):
+            database.init_db()
+
+        assert "WITHOUT ROWID" not in database._table_sql(db, "BearerToken")
+        assert database._table_sql(db, "BearerToken_rowid") is None
+        count = db.execute("SELECT COUNT(*) FROM BearerToken;").fetchone()[0]
+        assert count == 1
+
+
+def test_init_db_finishes_interrupted_migration(app):
+    with app.app_context():
+        db = database.get_db()
+        # An older migration renamed the table and created the new one,
+        # but stopped before copying the rows over
+        db.executescript(
+            """
+            CREATE TABLE BearerToken_rowid(
+              bearerToken TEXT PRIMARY KEY,
+              time TIMESTAMP NOT NULL,
+              authTokenUsed TEXT NOT NULL,
+              clientId TEXT NOT NULL,
+              scopes TEXT NOT NULL,
+              host TEXT NOT NULL,
+              revoked boolean DEFAULT FALSE
+            );
+            INSERT INTO BearerToken_rowid(bearerToken, time, authTokenUsed, clientId, scopes, host) VALUES ('tok', 0, 'code', 'cid', 'create', 'host');
+            PRAGMA user_version = 0;
+            """
+        )
+
+        database.init_db()
+
+        assert database._table_sql(db, "BearerToken_rowid") is None
+        row = db.execute(
+            "SELECT authTokenUsed FROM BearerToken WHERE bearerToken = 'tok';"
+        ).fetchone()
+        assert row["authTokenUsed"] == "code"
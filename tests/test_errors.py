@@ -0,0 +1,81 @@
+"""Tests for the error handlers"""
+
+import json
+
+from flask import Flask
+
+from interpersonal.blueprints import root
+from interpersonal.errors import (
+    InvalidBearerTokenError,
+    catchall_error_handler,
+    render_error,
+)
+
+
+def test_catchall_error_handler_hides_traceback(app):
+    with app.test_request_context("/"):
+        try:
+            raise RuntimeError("oops")
+        except RuntimeError as exc:
+            response, errcode = catchall_error_handler(exc)
+    assert errcode == 500
+    body = json.loads(response.data)
+    assert body["error"] == "Unhandled internal error"
+    assert body["error_description"] == "RuntimeError: oops"
+
+
+def test_catchall_error_handler_debug_traceback(app):
+    app.debug = True
+    with app.test_request_context("/"):
+        try:
+            raise RuntimeError("oops")
+        except RuntimeError as exc:
+            response, errcode = catchall_error_handler(exc)
+    body = json.loads(response.data)
+    assert body["error_description"].startswith("Traceback")
+
+
+def test_templated_json_error_escapes_value(app):
+    token = 'to"ken\\\n'
+    with app.test_request_context("/"):
+        exc = InvalidBearerTokenError(token)
+        response, errcode = exc.__interpersonal_exception_handler__()
+    assert errcode == 401
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data) == {
+        "error": "unauthorized",
+        "error_description": f"Invalid bearer token '{token}'",
+    }
+
+
+def test_catchall_error_handler_http_exception(app, client):
+    app.config["TESTING"] = False
+    app.config["MAX_CONTENT_LENGTH"] = 1000
+    response = client.post(
+        "/micropub/example-blog",
+        data={"h": "entry", "content": "x" * 2000},
+    )
+    assert response.status_code == 413
+
+
+def test_render_error_without_description(app):
+    with app.test_request_context("/"):
+        page, errcode = render_error(400, None)
+    assert errcode == 400
+    assert "None" not in page
+
+
+def test_render_error_pages_cached_per_app(app, tmp_path):
+    (tmp_path / "error.html.j2").write_text("Other {{ error_code }}: {{ error_desc }}")
+    other = Flask("other", template_folder=str(tmp_path))
+    other.register_blueprint(root.bp)
+
+    with app.test_request_context("/"):
+        page, _ = render_error(404, "first")
+    assert "Other" not in page
+    with other.test_request_context("/"):
+        page, _ = render_error(404, "second")
+    assert page == "Other 404: second"
+    with app.test_request_context("/"):
+        page, _ = render_error(404, "third")
+    assert "Other" not in page and "third" in page
@@ -1,12 +1,237 @@
 import datetime
+import hashlib
+import io
 
-from interpersonal.sitetypes.base import slugify
+import pytest
+
+from werkzeug.datastructures import FileStorage
+
+from interpersonal.configuration.basetypes import SiteSectionMap
+from interpersonal.errors import MicropubInvalidRequestError
+from interpersonal.sitetypes import base
+from interpersonal.sitetypes.base import (
+    HugoBase,
+    HugoPostSource,
+    OpaqueFile,
+    frontmatter_datetime,
+    sha256_stream,
+    slugify,
+)
+from interpersonal.sitetypes.example import HugoExampleBlog
 
 
 def test_slugify():
     inout = {
         "In this essay I will - without the slightest bit of concern - grapple,": "in-this-essay-i-will-without-the-slightest-bit-of",
+        "What's new in v2.0? Tabs\tand_underscores!": "whats-new-in-v20-tabsand_underscores",
+        "Ünïcödé wörds — déjà vu": "ünïcödé-wörds-déjà-vu",
         "": datetime.datetime.now().strftime("%Y%m%d-%H%M"),
     }
     for inp, outp in inout.items():
         assert slugify(inp) == outp
+
+
+def test_hugo_post_source_roundtrip():
+    raw = "---\nTitle: Hello\ndate: 2021-01-01\ntags:\n- a\n- b\n---\n\nPost body\n"
+    post = HugoPostSource.fromstr(raw)
+    assert post.frontmatter["title"] == "Hello"
+    assert post.frontmatter["date"] == datetime.date(2021, 1, 1)
+    reparsed = HugoPostSource.fromstr(post.tostr())
+    assert reparsed.frontmatter == post.frontmatter
+    assert reparsed.content.strip() == "Post body"
+
+
+def test_hugo_post_source_cached_frontmatter_copied():
+    raw = "---\ntitle: Cached\ntags:\n- a\n---\nbody"
+    first = HugoPostSource.fromstr(raw)
+    first.frontmatter["title"] = "Changed"
+    first.frontmatter["tags"].append("b")
+    second = HugoPostSource.fromstr(raw)
+    assert second.frontmatter == {"title": "Cached", "tags": ["a"]}
+
+    nested_raw = "---\nextra:\n  syndication:\n  - https://a.example.com\n---\nbody"
+    first = HugoPostSource.fromstr(nested_raw)
+    first.frontmatter["extra"]["syndication"].append("https://b.example.com")
+    second = HugoPostSource.fromstr(nested_raw)
+    assert second.frontmatter["extra"]["syndication"] == ["https://a.example.com"]
+
+    # Long frontmatter is not cached
+    cached = base._pickled_frontmatter.cache_info().currsize
+    long_raw = "---\ntitle: " + "x" * base.MAX_CACHED_FRONTMATTER_CHARS + "\n---\nbody"
+    assert HugoPostSource.fromstr(long_raw).frontmatter["title"].startswith("x")
+    assert base._pickled_frontmatter.cache_info().currsize == cached
+
+
+def test_hugo_post_source_empty_frontmatter():
+    post = HugoPostSource.fromstr("---\n\n---\nPost body\n")
+    assert post.frontmatter == {}
+    assert post.content == "Post body"
+
+
+def test_uri_to_post_bundle_dir():
+    blog = HugoBase(
+        "test",
+        "https://blog.example.com",
+        "https://interpersonal.example.com",
+        SiteSectionMap({"default": "blog"}),
+        mediaprefix="media",
+    )
+    inout = {
+        "https://blog.example.com/blog/post-slug": "content/blog/post-slug",
+        "https://blog.example.com//blog/post-slug": "content/blog/post-slug",
+        "/blog/post-slug": "content/blog/post-slug",
+        "//blog/post-slug": "content/blog/post-slug",
+    }
+    for inp, outp in inout.items():
+        assert blog._uri_to_post_bundle_dir(inp) == outp
+
+
+def test_media_item_uri_collected():
+    blog = HugoBase(
+        "test",
+        "https://blog.example.com",
+        "https://interpersonal.example.com",
+        SiteSectionMap({"default": "blog"}),
+        mediastaging="/tmp/staging",
+    )
+    staging_uri = "https://interpersonal.example.com/micropub/test/staging/abc123/photo.jpeg"
+    assert (
+        blog._media_item_uri_collected("post-slug", "blog", staging_uri)
+        == "https://blog.example.com/blog/post-slug/abc123/photo.jpeg"
+    )
+
+
+def test_sha256_stream():
+    data = b"media file contents" * 100000
+    expected = hashlib.sha256(data).hexdigest()
+    assert sha256_stream(io.BytesIO(data)).hexdigest() == expected
+    # The whole stream is hashed, wherever it was left
+    partly_read = io.BytesIO(data)
+    partly_read.read(100)
+    assert sha256_stream(partly_read).hexdigest() == expected
+
+    class ReadOnlyStream:
+        """A stream without readinto(), which hashlib.file_digest() can't use"""
+
+        def __init__(self, data):
+            self._bytesio = io.BytesIO(data)
+
+        def read(self, size=-1):
+            return self._bytesio.read(size)
+
+        def seek(self, offset):
+            return self._bytesio.seek(offset)
+
+    assert sha256_stream(ReadOnlyStream(data)).hexdigest() == expected
+
+
+def test_hugo_post_source_mf2json():
+    raw = "---\ntitle: Hello\ndate: 2021-01-01\ntags:\n- a\n- b\n---\n\nPost body\n"
+    post = HugoPostSource.fromstr(raw)
+    mf2json = post.mf2json
+    assert mf2json["properties"] == {
+        "name": ["Hello"],
+        "published": ["2021-01-01T00:00:00"],
+        "category": ["a", "b"],
+        "content": [{"markdown": "\nPost body"}],
+    }
+    mf2json["properties"]["category"].append("c")
+    assert post.frontmatter["title"] == "Hello"
+    assert post.frontmatter["tags"] == ["a", "b"]
+
+
+def test_hugo_post_source_mf2json_extra():
+    post = HugoPostSource(
+        {
+            "extra": {"like_of": ["https://example.com"], "name": "Extra name"},
+            "title": "Title",
+            "description": "Summary",
+        },
+        "",
+    )
+    assert post.mf2json["properties"] == {
+        "like-of": ["https://example.com"],
+        "name": ["Title"],
+        "summary": ["Summary"],
+        "extra": {"like_of": ["https://example.com"], "name": "Extra name"},
+    }
+
+
+def test_frontmatter_datetime():
+    utc = datetime.timezone.utc
+    inout = {
+        "2021-01-02T03:04:05Z": datetime.datetime(2021, 1, 2, 3, 4, 5, tzinfo=utc),
+        "2021-01-02T03:04:05+00:00": datetime.datetime(2021, 1, 2, 3, 4, 5, tzinfo=utc),
+        "2021-01-02T03:04:05": datetime.datetime(2021, 1, 2, 3, 4, 5),
+    }
+    for inp, outp in inout.items():
+        assert frontmatter_datetime(inp) == outp
+    assert frontmatter_datetime(datetime.date(2021, 1, 2)) == datetime.datetime(
+        2021, 1, 2
+    )
+    now = datetime.datetime.now()
+    assert frontmatter_datetime(now) is now
+
+
+def test_add_media_staging(tmp_path):
+    blog = HugoBase(
+        "test",
+        "https://blog.example.com",
+        "https://interpersonal.example.com",
+        SiteSectionMap({"default": "blog"}),
+        mediastaging=str(tmp_path),
+    )
+
+    def stage(filename):
+        upload = FileStorage(
+            io.BytesIO(b"image data"), filename=filename, content_type="image/png"
+        )
+        return blog._add_media_staging([OpaqueFile(upload)])[0]
+
+    assert stage("one.png").created
+    assert not stage("one.png").created
+    # The same contents under another name share the digest directory
+    two = stage("two.png")
+    assert two.created
+    digest = hashlib.sha256(b"image data").hexdigest()
+    assert two.uri.endswith(f"/media/{digest}/two.png")
+    assert (tmp_path / digest / "two.png").read_bytes() == b"image data"
+
+
+def test_example_blog_media_outlives_upload_stream(tmp_path):
+    blog = HugoExampleBlog(
+        "test",
+        "https://blog.example.com",
+        "https://interpersonal.example.com",
+        SiteSectionMap({"default": "blog"}),
+        mediastaging=str(tmp_path),
+    )
+    stream = io.BytesIO(b"image data")
+    upload = FileStorage(stream, filename="one.png", content_type="image/png")
+    added = blog._add_media([OpaqueFile(upload)])[0]
+    # The upload stream is closed when the request finishes
+    stream.close()
+    assert blog.media[added.uri].contents == b"image data"
+
+
+def test_hugo_post_source_frontmatter_limits():
+    # Anchors with a few aliases are fine
+    post = HugoPostSource.fromstr("---\na: &x [1, 2]\nb: *x\n---\nbody")
+    assert post.frontmatter["b"] == [1, 2]
+
+    laughs = ["a: &a [lol, lol]"]
+    for i in range(1, 10):
+        prev, cur = chr(ord("a") + i - 1), chr(ord("a") + i)
+        laughs.append(f"{cur}: &{cur} [{', '.join([f'*{prev}'] * 9)}]")
+    with pytest.raises(MicropubInvalidRequestError):
+        HugoPostSource.fromstr("---\n" + "\n".join(laughs) + "\n---\nbody")
+
+    # Only 48 aliases, but four nested levels of 16 expand to tens of thousands of nodes
+    nested = ["a: &a [" + ", ".join(["lol"] * 16) + "]"]
+    for prev, cur in (("a", "b"), ("b", "c"), ("c", "d")):
+        nested.append(f"{cur}: &{cur} [{', '.join([f'*{prev}'] * 16)}]")
+    with pytest.raises(MicropubInvalidRequestError):
+        HugoPostSource.fromstr("---\n" + "\n".join(nested) + "\n---\nbody")
+
+    with pytest.raises(MicropubInvalidRequestError):
+        HugoPostSource.fromstr("---\ntitle: " + "x" * 300 * 1024 + "\n---\nbody")